@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from bottom_left_fill import BottomLeftFill
+from layout import Part
+from nfp_assistant import NFPAssistant
+from settings import NestConfig
+
+
+def _refine_sheet(args):
+    """
+    Повторная раскладка одного листа в процессе пула: детали листа
+    раскладываются заново пакетным BottomLeftFill (с сортировкой).
+    Возвращает (полигоны в порядке входа, длина) или None, если раскладка не удалась.
+    """
+    width, height, polys, assistant_kw, rotations = args
+    try:
+        blf = BottomLeftFill(
+            width, height, polys, NFPAssistant(polys, **assistant_kw), rotations=rotations
+        )
+    except ValueError:
+        return None
+    result = [None] * len(polys)
+    for position, original in enumerate(blf.order):
+        result[original] = blf.parts[position].polygon()
+    return result, blf.getLength()
+
+
+class BinPacking(object):
+    """
+    Раскладка на несколько листов width x height.
+
+    Детали (по убыванию площади) добавляются онлайн-API BottomLeftFill в уже
+    открытые листы: strategy="first_fit" - в первый подходящий, "best_fit" -
+    в самый заполненный из подходящих. Если не подошёл ни один, открывается
+    новый лист; деталь, не помещающаяся и на пустой лист, попадает в rejected.
+    После распределения каждый лист раскладывается заново (refine=True),
+    при parallel=True - в пуле процессов; новая раскладка берётся, если она
+    короче по x. Каждая деталь ставится в лучшей из rotations ориентаций
+    (по умолчанию config.ROTATIONS, NestConfig; 1 - без перебора поворотов).
+    """
+
+    def __init__(self, width, height, polygons, nfp_assistant, **kw):
+        self.width = width
+        self.height = height
+        self.polygons = polygons
+        self.nfp_assistant = nfp_assistant
+        self.strategy = kw.get("strategy", "first_fit")
+        if self.strategy not in ("first_fit", "best_fit"):
+            raise ValueError(f"Неизвестная стратегия: {self.strategy}")
+        self.parallel = kw.get("parallel", False)
+        self.workers = kw.get("workers") or os.cpu_count() or 1
+        self.config = kw.get("config") or NestConfig()
+        self.rotations = kw.get("rotations", self.config.ROTATIONS)
+
+        self.sheets = []  # BottomLeftFill на каждый лист
+        self.assignment = []  # по листам: ключ детали в листе -> номер во входном списке
+        self.rejected = []  # номера деталей, не помещающихся на пустой лист
+        self.assign()
+        self.layouts = [self.getSheetPolygons(k) for k in range(len(self.sheets))]
+        if kw.get("refine", True):
+            self.refine()
+
+    def assign(self):
+        order = sorted(
+            range(len(self.polygons)), key=lambda i: Part(self.polygons[i]).area, reverse=True
+        )
+        for i in order:
+            if not self.addToSheets(i):
+                sheet = BottomLeftFill(
+                    self.width, self.height, [], self.nfp_assistant, rotations=self.rotations
+                )
+                placement = sheet.add(self.polygons[i])
+                if placement is None:
+                    print(f"Полигон {i} не помещается на пустой лист")
+                    self.rejected.append(i)
+                    continue
+                self.sheets.append(sheet)
+                self.assignment.append({placement["key"]: i})
+
+    def addToSheets(self, i):
+        candidates = list(range(len(self.sheets)))
+        if self.strategy == "best_fit":
+            # Сначала самые заполненные листы - меньше всего свободной площади
+            candidates.sort(key=lambda k: self.sheets[k].layout.utilization(), reverse=True)
+        for k in candidates:
+            placement = self.sheets[k].add(self.polygons[i])
+            if placement is not None:
+                self.assignment[k][placement["key"]] = i
+                return True
+        return False
+
+    def getSheetPolygons(self, k):
+        """Раскладка листа k: список {"index": номер во входном списке, "polygon": ...}"""
+        sheet = self.sheets[k]
+        return [
+            {"index": self.assignment[k][key], "polygon": part.polygon()}
+            for key, part in zip(sheet.keys, sheet.parts)
+        ]
+
+    def refine(self):
+        # Процессы получают уже посчитанные NFP деталей своего листа
+        tasks = []
+        for sheet, layout in zip(self.sheets, self.layouts):
+            assistant_kw = {
+                "nfp_engine": self.nfp_assistant.nfp_engine,
+                "spacing": self.nfp_assistant.spacing,
+                "spacing_tolerance": self.nfp_assistant.spacing_tolerance,
+                "nfps": self.nfp_assistant.exportNFPs([part.shape_id for part in sheet.parts]),
+            }
+            polys = [item["polygon"] for item in layout]
+            tasks.append((self.width, self.height, polys, assistant_kw, self.rotations))
+        if self.parallel and self.workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+                results = list(executor.map(_refine_sheet, tasks))
+        else:
+            results = [_refine_sheet(task) for task in tasks]
+        for k, result in enumerate(results):
+            if result is None:
+                continue
+            polys, length = result
+            if length < self.sheets[k].getLength():
+                # Лист переходит на новую раскладку вместе с layouts
+                indices = [item["index"] for item in self.layouts[k]]
+                keys = self.sheets[k].load(polys)
+                self.assignment[k] = dict(zip(keys, indices))
+                self.layouts[k] = self.getSheetPolygons(k)
+
+    @property
+    def sheet_count(self):
+        return len(self.layouts)
+
+    def sheetUtilization(self):
+        """Доля площади каждого листа, занятая деталями"""
+        return [
+            sum(Part(item["polygon"]).area for item in layout) / (self.width * self.height)
+            for layout in self.layouts
+        ]
+
+    def utilization(self):
+        """Общая доля площади открытых листов, занятая деталями"""
+        if not self.layouts:
+            return 0.0
+        return sum(self.sheetUtilization()) / len(self.layouts)
@@ -1,21 +1,23 @@
 import json
 import pandas as pd
+import time
 import warnings
 from datetime import datetime
+from constant.calculation_constants import BIAS
 from nfp_assistant import NFPAssistant
 from shapely.geometry import Polygon
+from shapely.ops import unary_union
 from show import PltFunc
-from util.packing_util import get_inner_fit_rectangle
-from util.polygon_util import (
-    check_bound,
-    check_right,
-    check_top,
-    poly_to_arr,
-    scale_polygon,
-    slide_poly,
-    slide_to_point,
-)
+from spatial_index import PlacedIndex
+from layout import Layout, Part
+from util.polygon_util import scale_polygon
 import numpy as np
+import shapely
+
+# Допуск выхода за границы контейнера
+TOLERANCE = 1e-10
+# Сколько кандидатов проверяется одним пакетным вызовом
+CANDIDATE_BATCH = 32
 
 
 def warning_to_exception(message, category, filename, lineno, file=None, line=None):
@@ -34,64 +36,337 @@ class BottomLeftFill(object):
         self.height = height
         self.length = self.height
         self.contain_length = self.height
-        self.polygons = original_polygons
         self.nfp_assistant = nfp_assistant
+        # Детали - массивы координат со смещением (layout.Part), а не списки
+        self.layout = Layout(width, height, [self.makePart(poly) for poly in original_polygons])
         self.container = Polygon([[0,0], [self.width,0], 
                                 [self.width,self.height], 
                                 [0,self.height]])
 
+        # Перебор позиций по целочисленной сетке (find_valid_position) - только
+        # для отладки, если аналитическое размещение не нашло точку
+        self.debug_grid_search = kw.get("debug_grid_search", False)
+        # Цель выбора точки размещения: "bottom_left", "min_bbox" или "gravity"
+        self.objective = kw.get("objective", "bottom_left")
+        # Ограничение времени (секунды): time_limit - на всю раскладку,
+        # part_time_limit - на одну деталь. С ограничением раскладка не падает:
+        # при нехватке времени пропускаются повороты и оставшиеся кандидаты,
+        # не размещённые детали попадают в unplaced, итоги - в report
+        self.time_limit = kw.get("time_limit")
+        self.part_time_limit = kw.get("part_time_limit")
+        self.anytime = self.time_limit is not None or self.part_time_limit is not None
+        self.start_time = time.time()
+        self.part_start_time = self.start_time
+        self.unplaced = []  # номера во входном списке не размещённых деталей
+        self.report = {
+            "complete": True,
+            "timed_out": False,
+            "elapsed": 0.0,
+            "placed": 0,
+            "unplaced": self.unplaced,
+            "skipped_rotations": 0,
+            "truncated_candidates": 0,
+            "skipped_grid_search": 0,
+        }
+
         print("Total Num:", len(original_polygons))
         
-        # Сортировка полигонов перед упаковкой
-        self.sort_polygons()
+        # Сортировка полигонов перед упаковкой; presorted=True - порядок задан
+        # вызывающим (например, хромосомой генетического алгоритма).
+        # order[k] - номер детали parts[k] во входном списке; детали add
+        # получают номера next_input, len(original_polygons) и далее
+        if kw.get("presorted", False):
+            self.order = list(range(len(self.parts)))
+        else:
+            self.sort_polygons()
         
         # Проверяем, помещаются ли фигуры в контейнер по размеру
         self.validate_polygons()
+
+        # ID форм из реестра NFPAssistant: поиск NFP по словарю, без пересчёта
+        for part in self.parts:
+            part.shape_id = nfp_assistant.getShapeId(part.points.tolist())
+        # (ID формы, угол, отражение) -> деталь в этой ориентации с готовыми метаданными
+        self.orientations = {}
+        # Начальный угол поворота каждой входной детали
+        if kw.get("angles") is not None:
+            for k, part in enumerate(self.parts):
+                angle = kw["angles"][self.order[k]]
+                if angle:
+                    self.layout.parts[k] = self.getOrientation(part, angle)
+        # Полный перебор ориентаций: rotations - число углов (NestConfig.ROTATIONS)
+        # или список углов, mirror - ещё и зеркальные отражения. Для каждой
+        # детали выбирается лучшая позиция по всем ориентациям; без них (и при
+        # rotations=1) повороты 90/180/270 пробуются, только если деталь не поместилась
+        rotations = kw.get("rotations")
+        if rotations == 1:
+            rotations = None
+        if rotations is None:
+            angles = [0]
+        elif isinstance(rotations, int):
+            angles = [360 / rotations * k for k in range(rotations)]
+        else:
+            angles = list(rotations)
+        self.mirror = kw.get("mirror", False)
+        self.orientation_set = [
+            (angle, mirror) for mirror in ((False, True) if self.mirror else (False,)) for angle in angles
+        ]
+        self.full_rotation = rotations is not None or self.mirror
+        if self.full_rotation:
+            self.precomputeOrientations(angles)
+        # ID формы -> (число учтённых деталей, объединение их NFP)
+        self.forbidden_regions = {}
         
-        if not self.placeFirstPoly():
-            raise ValueError("Первый полигон не помещается в контейнер")
-            
-        for i in range(1, len(self.polygons)):
-            # print(f"##### Place the {i + 1}th shape #####")
-            if not self.placePoly(i):
-                # Пробуем повернуть фигуру, если она не помещается
-                if not self.tryRotateAndPlace(i):
-                    raise ValueError(f"Не удалось разместить полигон {i+1}")
+        # Индекс уже размещённых деталей для проверки пересечений
+        self.placed_index = PlacedIndex()
+        self.placed_bounds = None  # общий bbox размещённых деталей
+        # Постоянные ключи деталей (номер в parts меняется при remove)
+        self.keys = list(range(len(self.parts)))
+        self.next_key = len(self.parts)
+        self.next_input = len(self.parts)
+
+        index = 0
+        while index < len(self.parts):
+            # print(f"##### Place the {index + 1}th shape #####")
+            if self.anytime and self.timeExceeded(total=True):
+                self.report["timed_out"] = True
+                self.dropPart(index)
+            elif self.placePart(index):
+                self.markPlaced(index)
+                index += 1
+            elif self.anytime:
+                self.dropPart(index)
+            elif index == 0:
+                raise ValueError("Первый полигон не помещается в контейнер")
+            else:
+                raise ValueError(f"Не удалось разместить полигон {index+1}")
+        self.getLength()
+        self.updateReport()
+
+    def placePart(self, index):
+        """Размещение детали: NFP, затем повороты, затем (для отладки) перебор сетки"""
+        self.part_start_time = time.time()
+        if self.full_rotation:
+            return self.placeBestOrientation(index) or self.gridSearchFallback(index)
+        if self.placePoly(index):
+            return True
+        # Пробуем повернуть фигуру, если она не помещается (если хватает времени)
+        if self.anytime and self.timeExceeded():
+            self.report["skipped_rotations"] += 1
+            return False
+        if self.tryRotateAndPlace(index):
+            return True
+        if self.debug_grid_search and self.anytime and self.timeExceeded():
+            self.report["skipped_grid_search"] += 1
+            return False
+        return self.gridSearchFallback(index)
+
+    def timeExceeded(self, total=False):
+        """Исчерпан ли бюджет всей раскладки или (total=False) текущей детали"""
+        now = time.time()
+        if self.time_limit is not None and now - self.start_time > self.time_limit:
+            return True
+        if total or self.part_time_limit is None:
+            return False
+        return now - self.part_start_time > self.part_time_limit
+
+    def dropPart(self, index):
+        """Исключить деталь из раскладки (режим с ограничением времени)"""
+        self.unplaced.append(self.order[index])
+        self.parts.pop(index)
+        self.keys.pop(index)
+        self.order.pop(index)
+        self.report["complete"] = False
+
+    def updateReport(self):
+        self.report["elapsed"] = time.time() - self.start_time
+        self.report["placed"] = len(self.parts)
+        return self.report
+
+    def add(self, poly, angle=0):
+        """
+        Онлайн-размещение детали (начальный поворот angle) поверх текущей
+        раскладки, без перестановки размещённых. Возвращает размещение
+        {"key", "shape_id", "polygon"} или None, если деталь не помещается -
+        раскладка при этом не меняется.
+        """
+        part = self.makePart(poly)
+        part.shape_id = self.nfp_assistant.getShapeId(part.points.tolist())
+        if angle:
+            part = self.getOrientation(part, angle)
+        index = len(self.parts)
+        self.parts.append(part)
+        self.keys.append(self.next_key)
+        self.order.append(self.next_input)
+        if not self.placePart(index):
+            self.parts.pop()
+            self.keys.pop()
+            self.order.pop()
+            return None
+        self.next_key += 1
+        self.next_input += 1
+        self.markPlaced(index)
+        self.getLength()
+        return self.getPlacement(index)
+
+    def makePart(self, poly):
+        """
+        Деталь для размещения. При зазоре NFPAssistant (spacing) размещается
+        кэшированный контур с отступом, а poly остаётся контуром результата
+        """
+        if not self.nfp_assistant.spacing:
+            return Part(poly)
+        return Part(self.nfp_assistant.getOffsetPolygon(poly), outline=poly)
+
+    def getPlacement(self, index):
+        part = self.parts[index]
+        return {"key": self.keys[index], "shape_id": part.shape_id, "polygon": part.polygon()}
+
+    def remove(self, key):
+        """Убрать деталь по ключу; возвращает её размещение"""
+        index = self.keys.index(key)
+        placement = self.getPlacement(index)
+        self.parts.pop(index)
+        self.keys.pop(index)
+        self.order.pop(index)
+        self.placed_index.remove(key)
+        # Объединения NFP, включающие удалённую деталь, пересчитываются при следующем запросе
+        self.forbidden_regions = {
+            shape_id: item for shape_id, item in self.forbidden_regions.items()
+            if item[0] <= index
+        }
+        self.placed_bounds = self.layout.bounds()
+        self.getLength()
+        return placement
+
+    def snapshot(self):
+        """Состояние раскладки для restore; детали и геометрии не копируются глубоко"""
+        return {
+            "parts": [part.copy() for part in self.parts],
+            "keys": list(self.keys),
+            "next_key": self.next_key,
+            "order": list(self.order),
+            "next_input": self.next_input,
+            "geoms": dict(self.placed_index.geoms),
+            "forbidden_regions": dict(self.forbidden_regions),
+        }
+
+    def restore(self, snapshot):
+        self.layout.parts = [part.copy() for part in snapshot["parts"]]
+        self.keys = list(snapshot["keys"])
+        self.next_key = snapshot["next_key"]
+        self.order = list(snapshot["order"])
+        self.next_input = snapshot["next_input"]
+        self.forbidden_regions = dict(snapshot["forbidden_regions"])
+        self.placed_index = PlacedIndex()
+        for key in self.keys:
+            self.placed_index.add(key, snapshot["geoms"][key])
+        self.placed_bounds = self.layout.bounds()
         self.getLength()
 
+    def load(self, polys):
+        """Раскладка из готовых положений деталей: polys - контуры на листе"""
+        self.layout.parts = [self.makePart(poly) for poly in polys]
+        for part in self.parts:
+            part.shape_id = self.nfp_assistant.getShapeId(part.points.tolist())
+        self.keys = list(range(len(self.parts)))
+        self.next_key = len(self.parts)
+        self.order = list(range(len(self.parts)))
+        self.next_input = len(self.parts)
+        self.reindex()
+        return self.keys
+
+    def reindex(self):
+        """Перестроить индекс и bbox после перемещения деталей извне (уплотнение)"""
+        self.placed_index = PlacedIndex()
+        for key, part in zip(self.keys, self.parts):
+            self.placed_index.add(key, part.placed_geometry())
+        self.forbidden_regions = {}
+        self.placed_bounds = self.layout.bounds()
+        self.getLength()
+
+    def resize(self, width):
+        """
+        Сменить длину листа (по x) с тёплым стартом: самое длинное начало
+        последовательности, целиком лежащее в новой длине, остаётся на месте
+        (для bottom_left раскладка с нуля поставила бы его так же), остальные
+        детали размещаются заново. Если разместить все не удалось, лист и
+        раскладка возвращаются к прежним; возвращает True при успехе.
+        """
+        state = self.snapshot()
+        old_width = self.width
+        keep = 0
+        while keep < len(self.parts) and self.parts[keep].placed_bounds[2] <= width + TOLERANCE:
+            keep += 1
+        self.setWidth(width)
+        for key in self.keys[keep:]:
+            self.placed_index.remove(key)
+        # Объединения NFP с переразмещаемыми деталями больше недействительны
+        self.forbidden_regions = {
+            shape_id: item for shape_id, item in self.forbidden_regions.items()
+            if item[0] <= keep
+        }
+        self.layout.parts = self.parts[:keep] + [part.copy() for part in self.parts[keep:]]
+        self.placed_bounds = Layout(width, self.height, self.parts[:keep]).bounds()
+        for i in range(keep, len(self.parts)):
+            if not self.placePart(i):
+                self.setWidth(old_width)
+                self.restore(state)
+                return False
+            self.markPlaced(i)
+        self.getLength()
+        return True
+
+    def setWidth(self, width):
+        self.width = width
+        self.layout.width = width
+        self.container = Polygon([[0, 0], [width, 0], [width, self.height], [0, self.height]])
+
+    @property
+    def parts(self):
+        return self.layout.parts
+
+    @property
+    def polygons(self):
+        """Координаты размещённых деталей списками [[x, y], ...]"""
+        return self.layout.polygons()
+
     def sort_polygons(self):
         """Сортировка полигонов по размеру ограничивающего прямоугольника"""
         # Вычисляем метрики для каждого полигона
-        poly_metrics = []
-        for i, poly in enumerate(self.polygons):
-            shape = Polygon(poly)
-            bbox_area = shape.bounds[2] * shape.bounds[3]  # Площадь ограничивающего прямоугольника
-            actual_area = shape.area  # Фактическая площадь
-            complexity = len(poly)  # Количество вершин как мера сложности
-            
-            # Вычисляем эффективность использования пространства
-            space_efficiency = actual_area / bbox_area if bbox_area > 0 else 0
-            
-            # Комбинированная метрика
-            score = (bbox_area * 0.5 +  # Учитываем площадь bbox
-                    (1 - space_efficiency) * 0.3 +  # Учитываем эффективность использования
-                    complexity * 0.2)  # Учитываем сложность формы
-                
-            poly_metrics.append((i, score))
+        poly_metrics = [(i, self.sortScore(part)) for i, part in enumerate(self.parts)]
         
         # Сортируем по убыванию метрики
         poly_metrics.sort(key=lambda x: x[1], reverse=True)
         
         # Переупорядочиваем полигоны
-        self.polygons = [self.polygons[i] for i, _ in poly_metrics]
+        self.layout.parts = [self.parts[i] for i, _ in poly_metrics]
+        # order[k] - номер во входном списке детали, стоящей на месте k
+        self.order = [i for i, _ in poly_metrics]
+
+    @staticmethod
+    def sortScore(part):
+        """Метрика порядка sort_polygons (больше - раньше)"""
+        bounds = part.placed_bounds
+        bbox_area = bounds[2] * bounds[3]  # Площадь ограничивающего прямоугольника
+        actual_area = part.area  # Фактическая площадь
+        complexity = len(part.coords)  # Количество вершин как мера сложности
+        
+        # Вычисляем эффективность использования пространства
+        space_efficiency = actual_area / bbox_area if bbox_area > 0 else 0
+        
+        # Комбинированная метрика
+        return (bbox_area * 0.5 +  # Учитываем площадь bbox
+                (1 - space_efficiency) * 0.3 +  # Учитываем эффективность использования
+                complexity * 0.2)  # Учитываем сложность формы
 
     def validate_polygons(self):
         """Проверка и масштабирование полигонов под размер контейнера"""
         max_poly_width = 0
         max_poly_height = 0
         
-        for poly in self.polygons:
-            poly_bounds = Polygon(poly).bounds
+        for part in self.parts:
+            poly_bounds = part.bounds
             max_poly_width = max(max_poly_width, poly_bounds[2] - poly_bounds[0])
             max_poly_height = max(max_poly_height, poly_bounds[3] - poly_bounds[1])
         
@@ -99,47 +374,95 @@ class BottomLeftFill(object):
         if max_poly_width > self.width or max_poly_height > self.height:
             scale_factor = min(self.width / max_poly_width, 
                              self.height / max_poly_height) * 0.95  # 5% запас
-            self.polygons = [scale_polygon(p, scale_factor) for p in self.polygons]
+            self.layout.parts = [
+                self.makePart(scale_polygon(part.polygon(), scale_factor)) for part in self.parts
+            ]
             print(f"Полигоны масштабированы с коэффициентом {scale_factor:.3f}")
 
     def tryRotateAndPlace(self, index):
         """Попытка разместить полигон с разными углами поворота"""
-        original_poly = self.polygons[index].copy()
+        original = self.parts[index]
         
         # Пробуем разные углы поворота
         for angle in [90, 180, 270]:
+            if self.anytime and self.timeExceeded():
+                self.report["skipped_rotations"] += 1
+                break
             # Поворачиваем полигон
-            rotated_poly = self.rotate_polygon(original_poly, angle)
-            self.polygons[index] = rotated_poly
+            self.parts[index] = self.getOrientation(original, angle)
             
             # Пробуем разместить повернутый полигон
             if self.placePoly(index):
                 return True
                 
         # Если не удалось разместить, возвращаем исходный полигон
-        self.polygons[index] = original_poly
+        self.parts[index] = original
         return False
 
-    def rotate_polygon(self, polygon, angle):
-        """Поворот полигона на заданный угол"""
-        # Находим центр полигона
-        poly = Polygon(polygon)
-        centroid = poly.centroid
-        
-        # Переносим в начало координат
-        translated = [[p[0] - centroid.x, p[1] - centroid.y] for p in polygon]
-        
-        # Поворачиваем
-        angle_rad = np.radians(angle)
-        cos_a = np.cos(angle_rad)
-        sin_a = np.sin(angle_rad)
-        
-        rotated = []
-        for p in translated:
-            x = p[0] * cos_a - p[1] * sin_a
-            y = p[0] * sin_a + p[1] * cos_a
-            rotated.append([x + centroid.x, y + centroid.y])
-            
+    def precomputeOrientations(self, angles):
+        """Варианты ориентаций каждого типа детали и их NFP - один раз до размещения"""
+        for part in {part.shape_id: part for part in self.parts}.values():
+            for angle, mirror in self.orientation_set:
+                if angle or mirror:
+                    self.getOrientation(part, angle, mirror)
+        self.nfp_assistant.precomputeOrientations(angles, self.mirror)
+
+    def placeBestOrientation(self, index):
+        """Лучшая по цели позиция среди всех ориентаций self.orientation_set"""
+        original = self.parts[index]
+        best, best_score = None, None
+        for angle, mirror in self.orientation_set:
+            if best is not None and self.anytime and self.timeExceeded():
+                self.report["skipped_rotations"] += 1
+                break
+            part = self.getOrientation(original, angle, mirror) if angle or mirror else original.copy()
+            self.parts[index] = part
+            offset = self.findPosition(index)
+            if offset is None:
+                continue
+            part.translate(*offset)
+            score = self.orientationScore(part)
+            if best is None or score < best_score:
+                best, best_score = part, score
+        self.parts[index] = original if best is None else best
+        return best is not None
+
+    def orientationScore(self, part):
+        """
+        Сравнение позиций разных ориентаций (у них разные опорные точки):
+        "bottom_left" - правый край детали, затем нижний; "gravity" и
+        "min_bbox" - те же величины, что в scoreCandidates
+        """
+        minx, miny, maxx, maxy = part.placed_bounds
+        cx, cy = part.centroid + part.offset
+        if self.objective == "bottom_left":
+            return (maxx, miny)
+        if self.objective == "gravity":
+            return (cx + cy, maxx, miny)
+        if self.objective == "min_bbox":
+            if self.placed_bounds is not None:
+                minx, miny = min(minx, self.placed_bounds[0]), min(miny, self.placed_bounds[1])
+                maxx, maxy = max(maxx, self.placed_bounds[2]), max(maxy, self.placed_bounds[3])
+            return ((maxx - minx) * (maxy - miny) + (cx + cy) * 0.01, part.placed_bounds[2])
+        raise ValueError(f"Неизвестная цель размещения: {self.objective}")
+
+    def getOrientation(self, part, angle, mirror=False):
+        """
+        Копия детали, отражённой (mirror) и повёрнутой на angle; форма и
+        метаданные ориентации кэшируются
+        """
+        key = (part.shape_id, angle, mirror)
+        if key not in self.orientations:
+            shape_id, oriented = part.shape_id, part
+            if mirror:
+                shape_id = self.nfp_assistant.getMirroredShapeId(shape_id)
+                oriented = part.mirrored(shape_id)
+            if angle:
+                shape_id = self.nfp_assistant.getRotatedShapeId(shape_id, angle)
+                oriented = oriented.rotated(angle, shape_id)
+            self.orientations[key] = oriented
+        rotated = self.orientations[key].copy()
+        rotated.offset = part.offset.copy()
         return rotated
 
     def check_placement(self, poly):
@@ -147,7 +470,6 @@ class BottomLeftFill(object):
         poly_shape = Polygon(poly)
         
         # Проверка границ контейнера с допуском
-        TOLERANCE = 1e-10
         bounds = poly_shape.bounds
         
         if (bounds[0] < -TOLERANCE or 
@@ -156,76 +478,202 @@ class BottomLeftFill(object):
             bounds[3] > self.height + TOLERANCE):
             return False
             
-        # Проверка пересечений с другими полигонами
-        for other_poly in self.polygons:
-            if other_poly != poly:
-                other_shape = Polygon(other_poly)
-                if poly_shape.intersects(other_shape):
-                    intersection = poly_shape.intersection(other_shape)
-                    if intersection.area > 1e-10:
-                        return False
-        return True
+        # Проверка пересечений только с размещёнными деталями рядом
+        return not self.placed_index.overlaps(poly_shape)
 
-    def find_valid_position(self, poly, start_x=0, start_y=0):
-        """Поиск валидной позиции для полигона"""
-        left_index, bottom_index, right_index, top_index = check_bound(poly)
-        poly_width = poly[right_index][0] - poly[left_index][0]
-        poly_height = poly[top_index][1] - poly[bottom_index][1]
+    def find_valid_position(self, part, start_x=0, start_y=0):
+        """Поиск валидной позиции для детали перебором сетки (только для отладки)"""
+        min_x, min_y, max_x, max_y = part.placed_bounds
+        poly_width = max_x - min_x
+        poly_height = max_y - min_y
         
         # Пробуем различные позиции
         for y in range(int(start_y), int(self.height - poly_height) + 1):
             for x in range(int(start_x), int(self.width - poly_width) + 1):
-                test_poly = poly.copy()
-                slide_poly(test_poly, x - poly[left_index][0], y - poly[bottom_index][1])
-                if self.check_placement(test_poly):
-                    slide_poly(poly, x - poly[left_index][0], y - poly[bottom_index][1])
+                offset = np.array([[x - min_x, y - min_y]])
+                if self.validateOffsets(part, offset)[0]:
+                    part.translate(x - min_x, y - min_y)
                     return True
         return False
 
     def placeFirstPoly(self):
-        """Размещение первого полигона с поиском позиции"""
-        return self.find_valid_position(self.polygons[0])
+        """
+        Размещение первого полигона: допустимая область - весь IFR, поэтому
+        деталь ставится в его левый нижний угол без перебора позиций
+        """
+        return self.placePart(0)
+
+    def gridSearchFallback(self, index):
+        if not self.debug_grid_search:
+            return False
+        print(f"Перебор сетки для полигона {index + 1}")
+        return self.find_valid_position(self.parts[index])
 
     def placePoly(self, index):
         """Размещение полигона с проверками"""
-        adjoin = self.polygons[index]
-        ifr = get_inner_fit_rectangle(self.polygons[index], self.length, self.width)
+        offset = self.findPosition(index)
+        if offset is None:
+            return False
+        self.parts[index].translate(*offset)
+        return True
+
+    def findPosition(self, index):
+        """Лучшее по цели допустимое смещение детали index или None"""
+        adjoin = self.parts[index]
+        ifr = self.getInnerFitRectangle(adjoin)
+        if ifr[2][0] < ifr[0][0] or ifr[2][1] < ifr[0][1]:
+            return None  # в этой ориентации деталь больше контейнера
         differ_region = Polygon(ifr)
 
-        # Собираем все NFP
-        nfp_regions = []
-        for main_index in range(0, index):
-            main = self.polygons[main_index]
-            try:
-                nfp = self.nfp_assistant.getDirectNFP(main, adjoin)
-                nfp_poly = Polygon(nfp)
-                nfp_regions.append(nfp_poly)
-                differ_region = differ_region.difference(nfp_poly)
-            except Exception as e:
-                print(f"NFP failure for polygons {main_index} and {index}: {str(e)}")
-                return False
+        # Объединение NFP всех размещённых деталей, инкрементально по типу детали
+        try:
+            forbidden = self.getForbiddenRegion(index)
+            if forbidden is not None:
+                differ_region = differ_region.difference(forbidden)
+        except Exception as e:
+            print(f"NFP failure for polygon {index}: {str(e)}")
+            return None
 
-        if differ_region.is_empty:
+        candidates = self.getCandidates(differ_region, ifr, forbidden)
+        if len(candidates) == 0:
             print(f"Нет места для размещения полигона {index+1}")
-            return False
+            return None
 
-        # Получаем все возможные точки размещения
-        differ_points = poly_to_arr(differ_region)
-        
-        # Сортируем точки по возрастанию x и y
-        differ_points.sort(key=lambda p: (p[0], p[1]))
-        
-        # Пробуем разные точки размещения
-        for point in differ_points:
-            refer_pt_index = check_top(adjoin)
-            test_poly = self.polygons[index].copy()
-            slide_to_point(test_poly, adjoin[refer_pt_index], point)
-            
-            if self.check_placement(test_poly):
-                slide_to_point(self.polygons[index], adjoin[refer_pt_index], point)
-                return True
-                
-        return False
+        # Кандидаты упорядочиваются по цели и проверяются пачками
+        offsets = candidates - adjoin.reference
+        offsets = offsets[self.scoreCandidates(adjoin, offsets)]
+        for start in range(0, len(offsets), CANDIDATE_BATCH):
+            batch = offsets[start:start + CANDIDATE_BATCH]
+            valid = np.nonzero(self.validateOffsets(adjoin, batch))[0]
+            if len(valid):
+                return batch[valid[0]]
+            if self.anytime and start + CANDIDATE_BATCH < len(offsets) and self.timeExceeded():
+                self.report["truncated_candidates"] += 1
+                return None
+        return None
+
+    def getInnerFitRectangle(self, part):
+        """
+        IFR опорной точки детали (как get_inner_fit_rectangle) по кэшированным
+        bounds и вершине check_top
+        """
+        min_x, min_y, max_x, max_y = part.bounds
+        top = part.coords[part.extremes[3]]
+        refer_pt = [top[0] - min_x, top[1] - min_y]
+        ifr_width = self.width - (max_x - min_x)
+        ifr_height = self.height - (max_y - min_y)
+        return [
+            refer_pt,
+            [refer_pt[0] + ifr_width, refer_pt[1]],
+            [refer_pt[0] + ifr_width, refer_pt[1] + ifr_height],
+            [refer_pt[0], refer_pt[1] + ifr_height],
+        ]
+
+    def getCandidates(self, differ_region, ifr, forbidden):
+        """
+        Точки для опорной вершины детали: вершины всех компонент допустимой
+        области (включая внутренние кольца), а также вершины границы запрещённой
+        области и её пересечения с границей IFR - они дают положения вплотную,
+        когда допустимая область вырождается в отрезки или точки
+        """
+        points = [shapely.get_coordinates(differ_region)]
+        if forbidden is not None:
+            ifr_poly = Polygon(ifr)
+            boundary = forbidden.boundary
+            points.append(shapely.get_coordinates(boundary))
+            points.append(shapely.get_coordinates(boundary.intersection(ifr_poly.boundary)))
+            points = np.concatenate(points)
+            # Внутри запрещённой области или вне IFR - точно недопустимо
+            inside = shapely.contains_xy(forbidden, points[:, 0], points[:, 1])
+            minx, miny, maxx, maxy = ifr_poly.bounds
+            in_ifr = (
+                (points[:, 0] >= minx - BIAS) & (points[:, 0] <= maxx + BIAS)
+                & (points[:, 1] >= miny - BIAS) & (points[:, 1] <= maxy + BIAS)
+            )
+            points = points[~inside & in_ifr]
+        else:
+            points = points[0]
+        if len(points) == 0:
+            return points
+        return np.unique(points, axis=0)
+
+    def scoreCandidates(self, part, offsets):
+        """
+        Порядок смещений по цели self.objective:
+        "bottom_left" - левее, затем ниже (опорная точка);
+        "min_bbox" - площадь общего bbox с размещёнными деталями плюс 0.01 (x + y)
+        центра детали, как в calculate_placement_score;
+        "gravity" - ближе к углу (0, 0): сумма координат центра детали
+        """
+        x, y = offsets[:, 0], offsets[:, 1]
+        if self.objective == "bottom_left":
+            return np.lexsort((y, x))
+        center = part.centroid + part.offset
+        cx, cy = x + center[0], y + center[1]
+        if self.objective == "gravity":
+            return np.lexsort((y, x, cx + cy))
+        if self.objective == "min_bbox":
+            minx, miny, maxx, maxy = part.placed_bounds
+            if self.placed_bounds is None:
+                area = np.full(len(offsets), (maxx - minx) * (maxy - miny))
+            else:
+                pminx, pminy, pmaxx, pmaxy = self.placed_bounds
+                width = np.maximum(maxx + x, pmaxx) - np.minimum(minx + x, pminx)
+                height = np.maximum(maxy + y, pmaxy) - np.minimum(miny + y, pminy)
+                area = width * height
+            return np.lexsort((y, x, area + (cx + cy) * 0.01))
+        raise ValueError(f"Неизвестная цель размещения: {self.objective}")
+
+    def validateOffsets(self, part, offsets):
+        """Для каждого смещения: помещается ли сдвинутая деталь без пересечений"""
+        coords = part.points[None, :, :] + offsets[:, None, :]
+        mins, maxs = coords.min(axis=1), coords.max(axis=1)
+        valid = (
+            (mins[:, 0] >= -TOLERANCE) & (mins[:, 1] >= -TOLERANCE)
+            & (maxs[:, 0] <= self.width + TOLERANCE) & (maxs[:, 1] <= self.height + TOLERANCE)
+        )
+        if valid.any():
+            geoms = shapely.polygons(coords[valid])
+            valid[valid] = ~self.placed_index.overlaps_batch(geoms)
+        return valid
+
+    def markPlaced(self, index):
+        """Добавить размещённую деталь в индекс и общий bbox"""
+        shape = self.placed_index.add(self.keys[index], self.parts[index].placed_geometry())
+        bounds = shape.bounds
+        if self.placed_bounds is None:
+            self.placed_bounds = bounds
+        else:
+            self.placed_bounds = (
+                min(self.placed_bounds[0], bounds[0]),
+                min(self.placed_bounds[1], bounds[1]),
+                max(self.placed_bounds[2], bounds[2]),
+                max(self.placed_bounds[3], bounds[3]),
+            )
+
+    def getForbiddenRegion(self, index):
+        """
+        Объединение NFP деталей 0..index-1 относительно детали index.
+        Объединение хранится для каждого типа (ID формы): следующая копия того же
+        типа добавляет только NFP деталей, размещённых после предыдущего расчёта.
+        """
+        adjoin = self.parts[index]
+        shape_id = adjoin.shape_id
+        count, region = self.forbidden_regions.get(shape_id, (0, None))
+        nfp_regions = [] if region is None else [region]
+        points = adjoin.points
+        for main_index in range(count, index):
+            main = self.parts[main_index]
+            nfp = self.nfp_assistant.getDirectNFP(
+                main.points, points, ids=(main.shape_id, shape_id)
+            )
+            if len(nfp) < 3:
+                raise ValueError(f"пустой NFP для полигона {main_index}")
+            nfp_regions.append(Polygon(nfp))
+        if len(nfp_regions) > 1 or (nfp_regions and region is None):
+            region = unary_union(nfp_regions)  # один пакетный вызов вместо цепочки difference
+        self.forbidden_regions[shape_id] = (index, region)
+        return region
 
     def getBottomLeft(self, poly):
         # 获得左底部点，优先左侧，有多个左侧选择下方
@@ -254,8 +702,8 @@ class BottomLeftFill(object):
 
     def showAll(self):
         # for i in range(0,2):
-        for i in range(0, len(self.polygons)):
-            PltFunc.addPolygon(self.polygons[i])
+        for poly in self.polygons:
+            PltFunc.addPolygon(poly)
         length = max(self.width, self.contain_length)
         PltFunc.showPlt(
             width=max(length, self.width), height=max(length, self.width), minus=100
@@ -271,12 +719,7 @@ class BottomLeftFill(object):
         )
 
     def getLength(self):
-        _max = 0
-        for i in range(0, len(self.polygons)):
-            extreme_index = check_right(self.polygons[i])
-            extreme = self.polygons[i][extreme_index][0]
-            if extreme > _max:
-                _max = extreme
+        _max = self.layout.length()
         self.contain_length = _max
         # PltFunc.addLine([[0,self.contain_length],[self.width,self.contain_length]],color="blue")
         return _max
@@ -0,0 +1,116 @@
+"""
+A/B сравнение реализаций NFP (nfp.NFP_ENGINES) по результату и времени.
+
+    python compare_nfp_engines.py                 # все data/*.csv
+    python compare_nfp_engines.py --dxf           # + фигуры из dxf_for_test/
+    python compare_nfp_engines.py --limit 6 vector
+
+Эталоном служит "orbital". NFP считаются совпадающими, если площадь
+симметрической разности не превышает --tolerance от площади эталона.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import time
+
+import pandas as pd
+from shapely.geometry import Polygon
+
+from nfp import NFP_ENGINES
+from settings import NestConfig
+
+REFERENCE_ENGINE = "orbital"
+
+
+def load_csv_polygons(path, limit):
+    df = pd.read_csv(path)
+    return [json.loads(poly) for poly in df["polygon"]][:limit]
+
+
+def load_dxf_polygons(path, limit, tolerance=0.5):
+    from input_utls import DXFShapeFinder
+
+    config = NestConfig({"SPLIT_SPLINES": True})
+    polygons = []
+    for poly in DXFShapeFinder(path, config).input_polygon():
+        if len(poly) < 3:
+            continue
+        shape = Polygon(poly).simplify(tolerance, preserve_topology=True)
+        if shape.is_empty or shape.geom_type != "Polygon":
+            continue
+        polygons.append([[x, y] for x, y in shape.exterior.coords[:-1]])
+    return polygons[:limit]
+
+
+def run_engine(engine, poly1, poly2):
+    start = time.perf_counter()
+    # Реализации печатают диагностику по каждой неудачной итерации
+    with contextlib.redirect_stdout(io.StringIO()):
+        nfp = NFP_ENGINES[engine](poly1, poly2)
+    return nfp, time.perf_counter() - start
+
+
+def nfp_difference(nfp1, nfp2):
+    """Относительная площадь симметрической разности двух NFP"""
+    shape1 = Polygon(nfp1.nfp).buffer(0)
+    shape2 = Polygon(nfp2.nfp).buffer(0)
+    if shape1.area == 0:
+        return 0.0 if shape2.area == 0 else 1.0
+    return shape1.symmetric_difference(shape2).area / shape1.area
+
+
+def compare(polygons, engines, tolerance):
+    stats = {
+        engine: {"time": 0.0, "errors": 0, "mismatches": 0} for engine in engines
+    }
+    for poly1 in polygons:
+        for poly2 in polygons:
+            reference, ref_time = run_engine(REFERENCE_ENGINE, poly1, poly2)
+            stats[REFERENCE_ENGINE]["time"] += ref_time
+            stats[REFERENCE_ENGINE]["errors"] += reference.error < 0
+            for engine in engines:
+                if engine == REFERENCE_ENGINE:
+                    continue
+                result, elapsed = run_engine(engine, poly1, poly2)
+                stats[engine]["time"] += elapsed
+                stats[engine]["errors"] += result.error < 0
+                if reference.error > 0 and result.error > 0:
+                    if nfp_difference(reference, result) > tolerance:
+                        stats[engine]["mismatches"] += 1
+    return stats
+
+
+def print_stats(title, pairs, stats):
+    print(f"\n{title}: {pairs} пар")
+    print(f"{'Реализация':<12} {'Время, с':>10} {'Ошибки':>8} {'Расхождения':>12}")
+    for engine, item in stats.items():
+        print(
+            f"{engine:<12} {item['time']:>10.3f} {item['errors']:>8} {item['mismatches']:>12}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("engines", nargs="*", default=sorted(NFP_ENGINES))
+    parser.add_argument("--limit", type=int, default=8, help="фигур из каждого файла")
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    parser.add_argument("--dxf", action="store_true", help="добавить dxf_for_test/")
+    args = parser.parse_args()
+
+    engines = [REFERENCE_ENGINE] + [e for e in args.engines if e != REFERENCE_ENGINE]
+    sources = [(path, load_csv_polygons) for path in sorted(glob.glob("data/*.csv"))]
+    if args.dxf:
+        sources += [
+            (path, load_dxf_polygons) for path in sorted(glob.glob("dxf_for_test/*.dxf"))
+        ]
+    for path, loader in sources:
+        polygons = loader(path, args.limit)
+        stats = compare(polygons, engines, args.tolerance)
+        print_stats(os.path.basename(path), len(polygons) ** 2, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from bottom_left_fill import BottomLeftFill
+from part_registry import get_shape_id
+from util.lru_cache import LRUCache
+
+
+class DecodeNode(object):
+    """Узел префиксного дерева: следующий шаг последовательности -> узел"""
+
+    __slots__ = ("key", "parent", "children", "depth")
+
+    def __init__(self, key=None, parent=None):
+        self.key = key
+        self.parent = parent
+        self.children = {}
+        self.depth = 0 if parent is None else parent.depth + 1
+
+
+class DecodeCache(object):
+    """
+    Префиксное дерево состояний раскладки (BottomLeftFill.snapshot) по
+    последовательностям шагов (ID формы, угол).
+
+    Состояния хранятся в LRU-кэше с весом, равным глубине узла (числу
+    размещённых деталей в снимке), max_parts ограничивает суммарный вес.
+    Узел без состояния и без потомков удаляется из дерева при вытеснении.
+    """
+
+    def __init__(self, max_parts=100000):
+        self.root = DecodeNode()
+        self.states = LRUCache(max_parts, on_evict=self.prune)
+
+    def __len__(self):
+        return len(self.states)
+
+    def resume(self, keys):
+        """Самый длинный сохранённый префикс keys: (узел, состояние или None)"""
+        node, found = self.root, self.root
+        for key in keys:
+            node = node.children.get(key)
+            if node is None:
+                break
+            if node in self.states:
+                found = node
+        if found is self.root:
+            return self.root, None
+        return found, self.states.get(found)
+
+    def child(self, node, key):
+        if key not in node.children:
+            node.children[key] = DecodeNode(key, node)
+        return node.children[key]
+
+    def store(self, node, state):
+        self.states.put(node, state, weight=node.depth)
+
+    def prune(self, node, state=None):
+        while node is not self.root and not node.children and node not in self.states:
+            del node.parent.children[node.key]
+            node = node.parent
+
+    def stats(self):
+        return self.states.stats()
+
+
+class PrefixDecoder(object):
+    """
+    Раскладка последовательностей (порядок, углы) онлайн-размещением
+    BottomLeftFill.add с продолжением от самого длинного уже разложенного
+    префикса из DecodeCache. Состояние сохраняется каждые stride деталей;
+    узлы дерева создаются только до сохранённого состояния.
+
+    Одинаковые копии формы взаимозаменяемы, поэтому шаг префикса -
+    (ID формы, угол), а не номер детали. decode возвращает общий для всех
+    вызовов BottomLeftFill: результат нужно прочитать до следующего decode.
+    rotations - перебор ориентаций при размещении (BottomLeftFill rotations).
+    """
+
+    def __init__(self, width, height, polygons, nfp_assistant, **kw):
+        self.polygons = polygons
+        self.stride = kw.get("stride", 1)
+        self.cache = DecodeCache(kw.get("max_parts", 100000))
+        self.shape_ids = [get_shape_id(poly) for poly in polygons]
+        self.blf = BottomLeftFill(width, height, [], nfp_assistant, rotations=kw.get("rotations"))
+        self.empty = self.blf.snapshot()
+        self.resumed = 0  # деталей взято из кэша
+        self.placed = 0  # деталей размещено заново
+
+    def decode(self, order, angles):
+        """BottomLeftFill с деталями order или None, если какая-то не поместилась"""
+        keys = [(self.shape_ids[i], angles[i]) for i in order]
+        node, state = self.cache.resume(keys)
+        self.blf.restore(self.empty if state is None else state)
+        self.resumed += node.depth
+        for k in range(node.depth, len(order)):
+            self.placed += 1
+            if self.blf.add(self.polygons[order[k]], angles[order[k]]) is None:
+                return None
+            if (k + 1) % self.stride == 0:
+                for key in keys[node.depth:k + 1]:
+                    node = self.cache.child(node, key)
+                self.cache.store(node, self.blf.snapshot())
+        return self.blf
+
+    def stats(self):
+        total = self.resumed + self.placed
+        return {
+            "resumed": self.resumed,
+            "placed": self.placed,
+            "reuse": self.resumed / total if total else 0.0,
+            "cache": self.cache.stats(),
+        }
@@ -0,0 +1,262 @@
+import functools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bottom_left_fill import BottomLeftFill
+from decode_cache import PrefixDecoder
+from layout import Part
+from nfp_assistant import NFPAssistant
+from part_registry import get_shape_id
+from settings import NestConfig
+
+
+def decode(width, height, polys, nfp_assistant, order, angles, rotations=None):
+    """
+    Раскладка хромосомы: детали в порядке order с начальными углами angles
+    (по номеру входной детали), rotations - перебор ориентаций при размещении.
+    Возвращает BottomLeftFill или None.
+    """
+    try:
+        return BottomLeftFill(
+            width, height, [polys[i] for i in order], nfp_assistant,
+            presorted=True, angles=[angles[i] for i in order], rotations=rotations,
+        )
+    except ValueError:
+        return None
+
+
+def make_decoder(width, height, polys, nfp_assistant, cache_parts=None, rotations=None):
+    """
+    Функция (order, angles) -> BottomLeftFill или None. С cache_parts -
+    PrefixDecoder: общие начала последовательностей не раскладываются заново
+    """
+    if cache_parts:
+        return PrefixDecoder(
+            width, height, polys, nfp_assistant, max_parts=cache_parts, rotations=rotations
+        ).decode
+    return functools.partial(decode, width, height, polys, nfp_assistant, rotations=rotations)
+
+
+def fitness(blf, height, area):
+    """Доля площади полосы до занятой длины (0 - раскладка не удалась)"""
+    if blf is None or blf.getLength() <= 0:
+        return 0.0
+    return area / (blf.getLength() * height)
+
+
+# Состояние процесса пула: детали и NFPAssistant с NFP из основного процесса
+_worker_state = None
+
+
+def _init_ga_worker(width, height, polys, assistant_kw, variants, nfps, cache_parts, search_rotations):
+    global _worker_state
+    assistant = NFPAssistant(polys, **assistant_kw)
+    # Повёрнутые варианты регистрируются до импорта, иначе их NFP не примутся
+    for shape_id, angle in variants:
+        assistant.getRotatedShapeId(shape_id, angle)
+    assistant.importNFPs(nfps)
+    area = sum(Part(poly).area for poly in polys)
+    decoder = make_decoder(width, height, polys, assistant, cache_parts, search_rotations)
+    _worker_state = (decoder, height, area)
+
+
+def evaluate_sequence(chromosome):
+    """Приспособленность хромосомы в процессе пула start_pool"""
+    decoder, height, area = _worker_state
+    return fitness(decoder(*chromosome), height, area)
+
+
+def start_pool(width, height, polys, nfp_assistant, workers, rotations=1, cache_parts=None,
+               search_rotations=None):
+    """
+    Пул процессов для оценки последовательностей (evaluate_sequence). NFP пар исходных
+    форм и пар с поворотами относительно исходной (rotations углов) считаются
+    здесь один раз и передаются каждому процессу при запуске; NFP остальных
+    пар процессы выводят поворотом (getTypeNFP) без расчёта. search_rotations -
+    перебор ориентаций при размещении в процессах (BottomLeftFill rotations).
+    """
+    registry = nfp_assistant.registry
+    base = [i for i, shape_id in enumerate(registry.ids) if shape_id not in registry.rotations]
+    nfp_assistant.getAllNFP(
+        [(i, j) for i in base for j in base if not nfp_assistant.hasStoredNFP(i, j)]
+    )
+    if rotations > 1:
+        nfp_assistant.precomputeRotations(rotations)
+    assistant_kw = {
+        "nfp_engine": nfp_assistant.nfp_engine,
+        "spacing": nfp_assistant.spacing,
+        "spacing_tolerance": nfp_assistant.spacing_tolerance,
+        "lazy": True,
+        "cache_size": None,
+    }
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_ga_worker,
+        initargs=(
+            width, height, polys, assistant_kw, list(registry.rotations.values()),
+            nfp_assistant.exportNFPs(), cache_parts, search_rotations,
+        ),
+    )
+
+
+class GeneticAlgorithm(object):
+    """
+    Генетический алгоритм по последовательности и углам деталей.
+
+    Хромосома - (order, angles): порядок входных деталей и угол каждой из
+    NestConfig.ROTATIONS вариантов (360 / ROTATIONS * k); при GROUP_ROTATION
+    все копии одной формы поворачиваются одинаково. Хромосома раскладывается
+    BottomLeftFill без сортировки, приспособленность - доля площади полосы
+    до занятой длины. Популяция NestConfig.POPULATION_SIZE, мутация с
+    вероятностью NestConfig.MUTA_RATE % на ген, лучшая особь переходит в
+    следующее поколение без изменений.
+
+    При parallel=True хромосомы оцениваются в пуле процессов: NFP всех
+    форм и поворотов считаются заранее в основном процессе и передаются
+    каждому процессу один раз при запуске пула.
+
+    Хромосомы раскладываются через PrefixDecoder (у каждого процесса свой):
+    мутанты и потомки с общим началом продолжают сохранённую раскладку.
+    decode_cache - предел кэша в размещённых деталях, 0 - без кэша.
+
+    history - по поколениям {"generation", "best", "mean", "elapsed"};
+    поиск останавливается после generations поколений или если лучшая
+    доля не выросла больше чем на tolerance за patience поколений.
+    """
+
+    def __init__(self, width, height, polygons, nfp_assistant, config=None, **kw):
+        self.width = width
+        self.height = height
+        self.polygons = polygons
+        self.nfp_assistant = nfp_assistant
+        self.config = config or NestConfig()
+        self.generations = kw.get("generations", 50)
+        self.patience = kw.get("patience", 10)
+        self.tolerance = kw.get("tolerance", 1e-4)
+        self.parallel = kw.get("parallel", False)
+        self.workers = kw.get("workers") or os.cpu_count() or 1
+        self.random = random.Random(kw.get("seed"))
+        self.decode_cache = kw.get("decode_cache", 100000)
+        self.decoder = make_decoder(width, height, polygons, nfp_assistant, self.decode_cache)
+
+        rotations = max(1, self.config.ROTATIONS)
+        self.angles = [360 / rotations * k for k in range(rotations)]
+        self.area = sum(Part(poly).area for poly in polygons)
+        # Группы деталей с общим углом (GROUP_ROTATION): копии одной формы
+        self.groups = {}
+        for i, poly in enumerate(polygons):
+            key = get_shape_id(poly) if self.config.GROUP_ROTATION else i
+            self.groups.setdefault(key, []).append(i)
+        self.group_of = {i: key for key, members in self.groups.items() for i in members}
+
+        self.fitness_cache = {}  # хромосома -> приспособленность
+        self.history = []
+        self.best = None
+        self.best_fitness = 0.0
+        self.run()
+        self.blf = decode(
+            width, height, polygons, nfp_assistant, self.best[0], self.best[1]
+        )
+
+    def initialPopulation(self):
+        """Первая особь - детали по убыванию площади без поворота, остальные - её мутанты"""
+        order = sorted(
+            range(len(self.polygons)), key=lambda i: Part(self.polygons[i]).area, reverse=True
+        )
+        adam = (tuple(order), tuple(0 for _ in self.polygons))
+        population = [adam]
+        while len(population) < max(2, self.config.POPULATION_SIZE):
+            population.append(self.mutate(adam))
+        return population
+
+    def mutate(self, chromosome):
+        order, angles = list(chromosome[0]), list(chromosome[1])
+        rate = self.config.MUTA_RATE / 100
+        for k in range(len(order)):
+            if self.random.random() < rate and k + 1 < len(order):
+                order[k], order[k + 1] = order[k + 1], order[k]
+            if self.random.random() < rate and len(self.angles) > 1:
+                self.setAngle(angles, order[k], self.random.choice(self.angles))
+        return tuple(order), tuple(angles)
+
+    def setAngle(self, angles, index, angle):
+        for i in self.groups[self.group_of[index]]:
+            angles[i] = angle
+
+    def crossover(self, parent1, parent2):
+        """Начало порядка от одного родителя, остальные детали - в порядке другого"""
+        cut = self.random.randint(1, max(1, len(parent1[0]) - 1))
+        children = []
+        for first, second in ((parent1, parent2), (parent2, parent1)):
+            head = first[0][:cut]
+            taken = set(head)
+            order = head + tuple(i for i in second[0] if i not in taken)
+            angles = list(second[1])
+            for i in head:
+                self.setAngle(angles, i, first[1][i])
+            children.append((order, tuple(angles)))
+        return children
+
+    def select(self, ranked, exclude=None):
+        """Случайная особь с весом по рангу (лучшие выбираются чаще)"""
+        candidates = [item for item in ranked if item is not exclude]
+        weights = [len(candidates) - k for k in range(len(candidates))]
+        return self.random.choices(candidates, weights)[0]
+
+    def evaluate(self, population, executor=None):
+        new = [chromosome for chromosome in dict.fromkeys(population) if chromosome not in self.fitness_cache]
+        if executor is not None:
+            results = executor.map(evaluate_sequence, new)
+        else:
+            results = (
+                fitness(self.decoder(*chromosome), self.height, self.area) for chromosome in new
+            )
+        for chromosome, value in zip(new, results):
+            self.fitness_cache[chromosome] = value
+        return [self.fitness_cache[chromosome] for chromosome in population]
+
+    def run(self):
+        start = time.time()
+        executor = self.startPool() if self.parallel and self.workers > 1 else None
+        try:
+            population = self.initialPopulation()
+            stagnant = 0
+            for generation in range(self.generations):
+                values = self.evaluate(population, executor)
+                ranked = [
+                    chromosome for _, chromosome in
+                    sorted(zip(values, population), key=lambda item: item[0], reverse=True)
+                ]
+                # Лучшая особь сохраняется, поэтому best не убывает
+                best = max(values)
+                stagnant = 0 if best > self.best_fitness + self.tolerance else stagnant + 1
+                self.best_fitness, self.best = best, ranked[0]
+                self.history.append({
+                    "generation": generation,
+                    "best": float(best),
+                    "mean": float(sum(values) / len(values)),
+                    "elapsed": time.time() - start,
+                })
+                if stagnant >= self.patience:
+                    break
+                population = [ranked[0]]
+                while len(population) < len(ranked):
+                    parent1 = self.select(ranked)
+                    parent2 = self.select(ranked, exclude=parent1)
+                    for child in self.crossover(parent1, parent2):
+                        if len(population) < len(ranked):
+                            population.append(self.mutate(child))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def startPool(self):
+        return start_pool(
+            self.width, self.height, self.polygons, self.nfp_assistant,
+            self.workers, len(self.angles), self.decode_cache,
+        )
+
+    def utilization(self):
+        return self.best_fitness
@@ -0,0 +1,159 @@
+import numpy as np
+import shapely
+
+from shapely.geometry import Polygon
+
+from util.polygon_util import mirror_polygon, rotate_polygon
+
+
+def area_centroid(coords):
+    """Ориентированная площадь и центр масс контура (массив n x 2)"""
+    x, y = coords[:, 0], coords[:, 1]
+    x_next, y_next = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y_next - x_next * y
+    signed_area = cross.sum() / 2
+    if signed_area == 0:
+        return 0.0, coords.mean(axis=0)
+    return signed_area, np.array([
+        ((x + x_next) * cross).sum() / (6 * signed_area),
+        ((y + y_next) * cross).sum() / (6 * signed_area),
+    ])
+
+
+class Part(object):
+    """
+    Деталь в раскладке: координаты формы (массив NumPy) и смещение.
+
+    Всё, что зависит только от формы, - bounds, индексы крайних вершин
+    (как check_bound), площадь, центр масс и подготовленная shapely-геометрия -
+    считается один раз на деталь и ориентацию. Размещение меняет только offset,
+    копии одной формы делят массивы и метаданные.
+
+    outline - контур детали для результата, если размещается другая форма
+    (контур с отступом spacing): coords используются для NFP и пересечений,
+    polygon() и area - по outline.
+    """
+
+    __slots__ = (
+        "shape_id",
+        "coords",
+        "offset",
+        "bounds",
+        "extremes",
+        "area",
+        "centroid",
+        "outline",
+        "_geometry",
+    )
+
+    def __init__(self, coords, shape_id=None, offset=None, outline=None):
+        self.shape_id = shape_id
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.outline = None if outline is None else np.asarray(outline, dtype=np.float64).reshape(-1, 2)
+        self.offset = np.zeros(2) if offset is None else np.array(offset, dtype=np.float64)
+        mins, maxs = self.coords.min(axis=0), self.coords.max(axis=0)
+        self.bounds = (mins[0], mins[1], maxs[0], maxs[1])
+        # left, bottom, right, top - первая вершина с крайней координатой
+        self.extremes = (
+            int(np.argmin(self.coords[:, 0])),
+            int(np.argmin(self.coords[:, 1])),
+            int(np.argmax(self.coords[:, 0])),
+            int(np.argmax(self.coords[:, 1])),
+        )
+        signed_area, self.centroid = area_centroid(self.coords)
+        self.area = abs(signed_area if self.outline is None else area_centroid(self.outline)[0])
+        self._geometry = None
+
+    def copy(self):
+        """Копия с собственным смещением, форма и метаданные общие"""
+        part = Part.__new__(Part)
+        for name in Part.__slots__:
+            setattr(part, name, getattr(self, name))
+        part.offset = self.offset.copy()
+        return part
+
+    @property
+    def geometry(self):
+        """Подготовленный shapely-полигон формы (без смещения)"""
+        if self._geometry is None:
+            self._geometry = shapely.polygons(self.coords)
+            shapely.prepare(self._geometry)
+        return self._geometry
+
+    @property
+    def points(self):
+        return self.coords + self.offset
+
+    @property
+    def placed_bounds(self):
+        dx, dy = self.offset
+        return (self.bounds[0] + dx, self.bounds[1] + dy, self.bounds[2] + dx, self.bounds[3] + dy)
+
+    @property
+    def reference(self):
+        """Опорная точка NFP - вершина check_top с учётом смещения"""
+        return self.coords[self.extremes[3]] + self.offset
+
+    def placed_geometry(self):
+        return shapely.polygons(self.points)
+
+    def polygon(self):
+        """Координаты контура (outline, если задан) в виде списка [[x, y], ...]"""
+        if self.outline is None:
+            return self.points.tolist()
+        return (self.outline + self.offset).tolist()
+
+    def translate(self, dx, dy):
+        self.offset = self.offset + (dx, dy)
+
+    def rotated(self, angle, shape_id=None):
+        """Деталь, повёрнутая вокруг центра масс формы; смещение сохраняется"""
+        outline = None
+        if self.outline is not None:
+            # Контур поворачивается вокруг того же центра, что и форма
+            center = Polygon(self.coords).centroid
+            outline = rotate_polygon(self.outline.tolist(), angle, (center.x, center.y))
+        return Part(rotate_polygon(self.coords.tolist(), angle), shape_id, self.offset, outline)
+
+    def mirrored(self, shape_id=None):
+        """Деталь, отражённая по x относительно центра масс формы (как mirror_polygon)"""
+        center_x = Polygon(self.coords).centroid.x
+        outline = None
+        if self.outline is not None:
+            outline = mirror_polygon(self.outline.tolist(), center_x)
+        return Part(mirror_polygon(self.coords.tolist(), center_x), shape_id, self.offset, outline)
+
+
+class Layout(object):
+    """Раскладка деталей на листе width x height"""
+
+    __slots__ = ("width", "height", "parts")
+
+    def __init__(self, width, height, parts=None):
+        self.width = width
+        self.height = height
+        self.parts = [] if parts is None else parts
+
+    def __len__(self):
+        return len(self.parts)
+
+    def polygons(self):
+        return [part.polygon() for part in self.parts]
+
+    def bounds(self):
+        """Общий bbox деталей или None"""
+        if not self.parts:
+            return None
+        bounds = np.array([part.placed_bounds for part in self.parts])
+        return (*bounds[:, :2].min(axis=0), *bounds[:, 2:].max(axis=0))
+
+    def length(self):
+        """Занятая длина вдоль x (как BottomLeftFill.getLength)"""
+        return max((part.placed_bounds[2] for part in self.parts), default=0)
+
+    def utilization(self, length=None):
+        """Доля площади листа (или полосы длиной length), занятая деталями"""
+        length = self.width if length is None else length
+        if length <= 0 or self.height <= 0:
+            return 0.0
+        return sum(part.area for part in self.parts) / (length * self.height)
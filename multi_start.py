@@ -0,0 +1,111 @@
+import os
+import random
+
+from bottom_left_fill import BottomLeftFill
+from genetic_algorithm import evaluate_sequence, decode, fitness, make_decoder, start_pool
+from layout import Part
+from settings import NestConfig
+from shapely.geometry import Polygon
+
+
+def hull_waste(part):
+    """Площадь выпуклой оболочки, не занятая деталью"""
+    return Polygon(part.coords).convex_hull.area - part.area
+
+
+# Правила порядка: метрика детали, детали раскладываются по её убыванию
+ORDER_RULES = {
+    "score": BottomLeftFill.sortScore,
+    "area": lambda part: part.area,
+    "length": lambda part: part.bounds[2] - part.bounds[0],
+    "height": lambda part: part.bounds[3] - part.bounds[1],
+    "bbox_area": lambda part: (part.bounds[2] - part.bounds[0]) * (part.bounds[3] - part.bounds[1]),
+    "hull_waste": hull_waste,
+}
+
+
+class MultiStart(object):
+    """
+    Раскладка с несколькими стартовыми порядками и выбором лучшей.
+
+    rules - имена из ORDER_RULES; random_starts - сколько случайно
+    возмущённых порядков добавить (соседние перестановки с вероятностью
+    perturbation, seed - зерно). Правило k-го возмущения - rules[k % len].
+    При parallel=True порядки раскладываются одновременно в пуле процессов
+    с общими заранее посчитанными NFP (genetic_algorithm.start_pool).
+    Каждая деталь ставится в лучшей из rotations ориентаций (по умолчанию
+    config.ROTATIONS, NestConfig; 1 - без перебора поворотов).
+
+    results - по стартам {"rule", "utilization"}; best_rule - победивший,
+    blf - его раскладка.
+    """
+
+    def __init__(self, width, height, polygons, nfp_assistant, **kw):
+        self.width = width
+        self.height = height
+        self.polygons = polygons
+        self.nfp_assistant = nfp_assistant
+        self.rules = kw.get("rules", list(ORDER_RULES))
+        self.random_starts = kw.get("random_starts", 4)
+        self.perturbation = kw.get("perturbation", 0.1)
+        self.parallel = kw.get("parallel", False)
+        self.workers = kw.get("workers") or os.cpu_count() or 1
+        self.seed = kw.get("seed", 0)
+        self.config = kw.get("config") or NestConfig()
+        self.rotations = kw.get("rotations", self.config.ROTATIONS)
+        for rule in self.rules:
+            if rule not in ORDER_RULES:
+                raise ValueError(f"Неизвестное правило порядка: {rule}")
+
+        self.area = sum(Part(poly).area for poly in polygons)
+        self.starts = self.getStarts()
+        self.results = []
+        self.run()
+        best = max(range(len(self.results)), key=lambda k: self.results[k]["utilization"])
+        self.best_rule = self.results[best]["rule"]
+        self.best_utilization = self.results[best]["utilization"]
+        self.blf = decode(
+            width, height, polygons, nfp_assistant, *self.starts[best][1], rotations=self.rotations
+        )
+
+    def getOrder(self, rule):
+        parts = [
+            Part(self.nfp_assistant.getOffsetPolygon(poly), outline=poly) for poly in self.polygons
+        ]
+        metric = ORDER_RULES[rule]
+        return tuple(sorted(range(len(parts)), key=lambda i: metric(parts[i]), reverse=True))
+
+    def getStarts(self):
+        """Список (имя старта, (порядок, углы))"""
+        angles = tuple(0 for _ in self.polygons)
+        orders = {rule: self.getOrder(rule) for rule in self.rules}
+        starts = [(rule, (orders[rule], angles)) for rule in self.rules]
+        for k in range(self.random_starts):
+            rule = self.rules[k % len(self.rules)]
+            rng = random.Random(self.seed + k)
+            order = list(orders[rule])
+            for i in range(len(order) - 1):
+                if rng.random() < self.perturbation:
+                    order[i], order[i + 1] = order[i + 1], order[i]
+            starts.append((f"{rule}+random{k}", (tuple(order), angles)))
+        return starts
+
+    def run(self):
+        chromosomes = [chromosome for _, chromosome in self.starts]
+        if self.parallel and self.workers > 1 and len(chromosomes) > 1:
+            executor = start_pool(
+                self.width, self.height, self.polygons, self.nfp_assistant,
+                min(self.workers, len(chromosomes)), self.rotations,
+                search_rotations=self.rotations,
+            )
+            with executor:
+                values = list(executor.map(evaluate_sequence, chromosomes))
+        else:
+            decoder = make_decoder(
+                self.width, self.height, self.polygons, self.nfp_assistant, rotations=self.rotations
+            )
+            values = [fitness(decoder(*chromosome), self.height, self.area) for chromosome in chromosomes]
+        self.results = [
+            {"rule": name, "utilization": float(value)}
+            for (name, _), value in zip(self.starts, values)
+        ]
@@ -1,6 +1,6 @@
 import copy
 from constant.calculation_constants import BIAS
-from shapely.geometry import Polygon, Point, mapping, LineString
+from shapely.geometry import Polygon, mapping, LineString
 from show import PltFunc
 from util.polygon_util import (
     almost_equal,
@@ -12,9 +12,12 @@ from util.polygon_util import (
     intersection,
     judge_position,
     new_line_inter,
+    penetration_depths,
     slide_poly,
     slide_to_point,
 )
+from util.minkowski_util import convex_nfp, minkowski_nfp, rectangle_nfp
+from util.nfp_kernel import poly_to_array, touching_batch, trim_scale_batch
 
 
 class NFP(object):
@@ -29,7 +32,9 @@ class NFP(object):
         slide_to_point(self.sliding, self.sliding[self.locus_index], self.start_point)
         self.start = True  # 判断是否初始
         self.nfp = []
-        self.rectangle = False
+        # rectangle=True - оба полигона прямоугольники по осям, NFP в замкнутом
+        # виде; по умолчанию выбранный алгоритм работает для любой пары
+        self.rectangle = kw.get("rectangle", False)
         self.error = 1
         self.main()
         if "show" in kw:
@@ -40,15 +45,10 @@ class NFP(object):
 
     def main(self):
         i = 0
-        if self.rectangle:  # 若矩形则直接快速运算 点的index为左下角开始逆时针旋转
-            width = self.sliding[1][0] - self.sliding[0][0]
-            height = self.sliding[3][1] - self.sliding[0][1]
-            self.nfp.append([self.stationary[0][0], self.stationary[0][1]])
-            self.nfp.append([self.stationary[1][0] + width, self.stationary[1][1]])
-            self.nfp.append(
-                [self.stationary[2][0] + width, self.stationary[2][1] + height]
+        if self.rectangle:  # 若矩形则直接快速运算
+            self.nfp = rectangle_nfp(
+                self.stationary, self.sliding, self.sliding[self.locus_index]
             )
-            self.nfp.append([self.stationary[3][0], self.stationary[3][1] + height])
         else:
             while self.judgeEnd() == False and i < 75:  # 大于等于75会自动退出的，一般情况是计算出错
                 touching_edges = self.detectTouching()
@@ -347,12 +347,97 @@ class NFP(object):
         计算poly2的checkTop到NFP的距离
         Source: https://stackoverflow.com/questions/36972537/distance-from-point-to-polygon-when-inside
         """
-        d1 = Polygon(self.nfp).distance(Point(self.original_top))
-        # if point in inside polygon, d1=0
-        # d2: distance from the point to nearest boundary
-        if d1 == 0:
-            d2 = Polygon(self.nfp).boundary.distance(Point(self.original_top))
-            # print('d2:',d2)
-            return d2
-        else:
-            return 0
+        return float(penetration_depths([Polygon(self.nfp)], [self.original_top])[0, 0])
+
+
+class VectorNFP(NFP):
+    """
+    Орбитальный NFP с векторизованным поиском касаний.
+    Оба полигона передаются в ядро как непрерывные массивы float64, все пары
+    рёбер проверяются одним проходом NumPy (util.nfp_kernel.touching_batch).
+    Записи касаний совпадают с NFP.detectTouching с точностью до округления
+    точки пересечения (GEOS считает её в повышенной точности).
+    Укорачивание вектора тоже пакетное (util.nfp_kernel.trim_scale_batch).
+    """
+
+    def __init__(self, poly1, poly2, **kw):
+        # stationary не двигается - массив строится один раз
+        self.stationary_arr = poly_to_array(poly1)
+        super().__init__(poly1, poly2, **kw)
+
+    def detectTouching(self):
+        stationary = self.stationary_arr
+        # sliding берём из текущего списка: сдвиги накапливаются так же, как в NFP
+        sliding = poly_to_array(self.sliding)
+        rows, cols, pts = touching_batch(stationary, sliding)
+        n1, n2 = len(stationary), len(sliding)
+        touch_edges = []
+        for i, j, pt in zip(rows.tolist(), cols.tolist(), pts.tolist()):
+            edge1 = [stationary[i].tolist(), stationary[(i + 1) % n1].tolist()]
+            edge2 = [sliding[j].tolist(), sliding[(j + 1) % n2].tolist()]
+            touch_edges.append(
+                {
+                    "edge1": edge1,
+                    "edge2": edge2,
+                    "vector1": self.edgeToVector(edge1),
+                    "vector2": self.edgeToVector(edge2),
+                    "edge1_bound": almost_equal(edge1[0], pt) or almost_equal(edge1[1], pt),
+                    "edge2_bound": almost_equal(edge2[0], pt) or almost_equal(edge2[1], pt),
+                    "stationary_start": almost_equal(edge1[0], pt),
+                    "orbiting_start": almost_equal(edge2[0], pt),
+                    "pt": pt,
+                    "type": 0,
+                }
+            )
+        return touch_edges
+
+    def trimVector(self, vector):
+        scale = trim_scale_batch(
+            self.stationary_arr, poly_to_array(self.sliding), vector
+        )
+        if scale < 1:
+            vector[0] = vector[0] * scale
+            vector[1] = vector[1] * scale
+
+
+class MinkowskiNFP(NFP):
+    """
+    NFP как сумма Минковского: для выпуклых пар - слияние рёбер за O(n + m),
+    для вогнутых - объединение сумм выпуклых частей (разбиение кэшируется).
+    Опорная точка та же, что у орбитального NFP - check_top(sliding).
+    Внутренние отверстия NFP отбрасываются, как и в орбитальном алгоритме.
+    """
+
+    def main(self):
+        if self.rectangle:
+            super().main()
+            return
+        try:
+            region = minkowski_nfp(
+                self.stationary, self.sliding, self.sliding[self.locus_index]
+            )
+        except ValueError as e:
+            print(f"Не удалось разбить полигон на выпуклые части: {e}")
+            self.error = -6  # разбиение не удалось
+            return
+        self.nfp = [[x, y] for x, y in region.exterior.coords[:-1]]
+
+
+class ConvexNFP(MinkowskiNFP):
+    """NFP выпуклой пары: одно слияние рёбер, без разбиения на части и объединения"""
+
+    def main(self):
+        if self.rectangle:
+            NFP.main(self)
+            return
+        self.nfp = convex_nfp(
+            self.stationary, self.sliding, self.sliding[self.locus_index]
+        )
+
+
+# Доступные реализации NFP, выбираются через NFPAssistant(nfp_engine=...)
+NFP_ENGINES = {
+    "orbital": NFP,
+    "vector": VectorNFP,
+    "minkowski": MinkowskiNFP,
+}
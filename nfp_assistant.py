@@ -1,153 +1,481 @@
-import copy
-import csv
-import json
-import pandas as pd
-from nfp import NFP
-from shapely.geometry import Polygon
-from util.array_util import delete_redundancy, get_index_multi
-from util.polygon_util import get_point, get_slide
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from nfp import NFP, NFP_ENGINES, ConvexNFP
+from nfp_store import NFPStore, nfp_key
+from part_registry import PartRegistry, get_shape_id
+from util.lru_cache import LRUCache
+from util.minkowski_util import classify_polygon
+from util.polygon_util import check_top, get_slide, offset_polygon, rotation_cos_sin
+
+
+def compute_nfp(poly1, poly2, engine, kinds=None):
+    """
+    Расчёт NFP заданной реализацией; быстрые пути для прямоугольников и
+    выпуклых пар - только при "auto" (выбор по паре).
+    kinds - типы форм (classify_polygon), если уже известны.
+    Использованный путь записывается в nfp_object.path.
+
+    Полигоны считаются сдвинутыми в неотрицательные координаты (bbox от
+    начала координат): орбитальный алгоритм ошибается на контурах с
+    отрицательными координатами (например, контур с отступом spacing).
+    NFP сдвигается обратно в положение poly1.
+    """
+    (x1, y1), (x2, y2) = np.min(poly1, axis=0), np.min(poly2, axis=0)
+    nfp_object = _compute_nfp(get_slide(poly1, -x1, -y1), get_slide(poly2, -x2, -y2), engine, kinds)
+    if nfp_object.nfp:
+        nfp_object.nfp = get_slide(nfp_object.nfp, x1, y1)
+    return nfp_object
+
+
+def _compute_nfp(poly1, poly2, engine, kinds=None):
+    if engine != "auto":
+        nfp_object = NFP_ENGINES[engine](poly1, poly2, rectangle=False)
+        nfp_object.path = engine
+        return nfp_object
+    if kinds is None:
+        kinds = (classify_polygon(poly1), classify_polygon(poly2))
+    # Прямоугольники - в замкнутом виде, выпуклые пары - одно слияние рёбер
+    if kinds == ("rectangle", "rectangle"):
+        nfp_object = NFP(poly1, poly2, rectangle=True)
+        nfp_object.path = "rectangle"
+        return nfp_object
+    if "concave" not in kinds:
+        nfp_object = ConvexNFP(poly1, poly2, rectangle=False)
+        nfp_object.path = "convex"
+        return nfp_object
+    # Вогнутые пары - орбитальный алгоритм, при ошибке - сумма Минковского
+    nfp_object = NFP_ENGINES["vector"](poly1, poly2, rectangle=False)
+    nfp_object.path = "vector"
+    if nfp_object.error < 0:
+        nfp_object = NFP_ENGINES["minkowski"](poly1, poly2, rectangle=False)
+        nfp_object.path = "minkowski"
+    return nfp_object
+
+
+# Состояние процесса-исполнителя: полигоны передаются один раз при запуске пула
+_worker_polys = None
+_worker_kinds = None
+_worker_engine = None
+
+
+def _init_nfp_worker(polys, kinds, engine):
+    global _worker_polys, _worker_kinds, _worker_engine
+    _worker_polys = polys
+    _worker_kinds = kinds
+    _worker_engine = engine
+
+
+def _nfp_chunk_worker(pairs):
+    """Расчёт NFP для пачки пар (i, j) в процессе пула"""
+    result = []
+    for i, j in pairs:
+        nfp_object = compute_nfp(
+            _worker_polys[i], _worker_polys[j], _worker_engine,
+            (_worker_kinds[i], _worker_kinds[j]),
+        )
+        result.append((i, j, nfp_object.nfp, nfp_object.error, nfp_object.path))
+    return result
+
+
+DEFAULT_STORE_PATH = "history/nfp.store"
 
 
 class NFPAssistant(object):
     def __init__(self, polys, **kw):
-        self.polys = delete_redundancy(copy.deepcopy(polys))
-        self.area_list, self.first_vec_list, self.centroid_list = [], [], []  # 作为参考
-        for poly in self.polys:
-            P = Polygon(poly)
-            self.centroid_list.append(get_point(P.centroid))
-            self.area_list.append(int(P.area))
-            self.first_vec_list.append(
-                [poly[1][0] - poly[0][0], poly[1][1] - poly[0][1]]
-            )
-        self.nfp_list = [[0] * len(self.polys) for i in range(len(self.polys))]
+        # Зазор между деталями (NestConfig.SPACING): NFP считаются по контурам,
+        # отстоящим от детали на spacing / 2. Контур строится и упрощается
+        # (допуск spacing_tolerance) один раз на форму
+        self.spacing = kw.get("spacing", 0)
+        self.spacing_tolerance = kw.get("spacing_tolerance", self.spacing / 20)
+        self._offsets = {}  # ID исходной формы -> контур относительно первой вершины
+
+        # Каждая различная форма - один тип реестра, NFP считаются по типам.
+        # nfp_list[i][j] хранится относительно первой вершины polys[i]
+        self.registry = PartRegistry([self.getOffsetPolygon(poly) for poly in polys])
+        self.polys = self.registry.shapes
+
+        # Ленивый режим: NFP считаются при первом запросе getDirectNFP и хранятся
+        # в LRU-кэше на cache_size пар вместо полной матрицы nfp_list. Это
+        # единственное хранилище NFP: кэш getDirectNFP держит только сдвиги
+        self.lazy = kw.get("lazy", False)
+        self.cache_size = kw.get("cache_size", 4096)
+        if self.lazy:
+            self.nfp_cache = LRUCache(self.cache_size)
+            self.nfp_list = None
+        else:
+            self.nfp_cache = None
+            self.nfp_list = [[0] * len(self.polys) for i in range(len(self.polys))]
+
+        # Уже посчитанные NFP (exportNFPs другого NFPAssistant), например в процессах пула
+        if "nfps" in kw:
+            self.importNFPs(kw["nfps"])
         
-        # Инициализация кэша NFP
-        self._nfp_cache = {}
+        # Кэш getDirectNFP: ключ - пара типов и опорная вершина poly2, значение -
+        # сдвиг NFP пары типов (nfp_list / nfp_cache) к этой вершине. Сам NFP
+        # берётся из хранилища, поэтому память NFP ограничена только cache_size
+        self._nfp_cache = LRUCache(kw.get("direct_cache_size", 4096))
+        # Сколько пар получено каждым путём: "rectangle", "convex", реализация NFP,
+        # "symmetric" (из обратной пары), "rotated" (из пары по относительному углу)
+        self.nfp_paths = Counter()
+
+        # Реализация NFP: "auto" - выбор для каждой пары (прямоугольники и выпуклые
+        # пары в замкнутом виде), либо одна реализация для всех пар без быстрых
+        # путей (для A/B сравнения): "orbital" (исходная), "vector" (NumPy-ядро
+        # касаний), "minkowski" (сумма Минковского)
+        self.nfp_engine = kw.get("nfp_engine", "auto")
+        if self.nfp_engine != "auto" and self.nfp_engine not in NFP_ENGINES:
+            raise ValueError(f"Неизвестный nfp_engine: {self.nfp_engine}")
         
+        # История NFP - бинарное хранилище nfp_store.NFPStore.
+        # history - уже открытое хранилище (без повторного чтения с диска)
         self.load_history = False
-        self.history_path = None
-        self.history = None
-        if "history_path" in kw:
-            self.history_path = kw["history_path"]
+        self.history_path = kw.get("history_path", DEFAULT_STORE_PATH)
+        self.history = kw.get("history")
+
+        self.store_nfp = kw.get("store_nfp", False)
+        self.store_path = kw.get("store_path", self.history_path)
+        self.nfp_store = None
 
         if "load_history" in kw:
             if kw["load_history"] == True:
-                # 从内存中加载history 直接传递pandas的df对象 缩短I/O时间
-                if "history" in kw:
-                    self.history = kw["history"]
                 self.load_history = True
-                self.loadHistory()
-
-        self.store_nfp = False
-        if "store_nfp" in kw:
-            if kw["store_nfp"] == True:
-                self.store_nfp = True
+                # В ленивом режиме хранилище читается по промаху кэша
+                if self.lazy:
+                    self.history = self.history or self.openStore(self.history_path)
+                else:
+                    self.loadHistory()
 
-        self.store_path = None
-        if "store_path" in kw:
-            self.store_path = kw["store_path"]
+        # Параллельный расчёт всех NFP: workers процессов, пачки по chunk_size пар.
+        # Если пар меньше parallel_min_pairs, запуск пула дороже расчёта - считаем в одном процессе
+        self.parallel = kw.get("parallel", False)
+        self.workers = kw.get("workers") or os.cpu_count() or 1
+        self.chunk_size = kw.get("chunk_size")
+        self.parallel_min_pairs = kw.get("parallel_min_pairs", 64)
 
-        if "get_all_nfp" in kw:
-            if kw["get_all_nfp"] == True and self.load_history == False:
+        if "get_all_nfp" in kw and not self.lazy:
+            if kw["get_all_nfp"] == True:
+                # После загрузки истории считаются только недостающие пары
                 self.getAllNFP()
 
+        # Число углов поворота (NestConfig.ROTATIONS, 1 - без вращения);
+        # precompute_rotations - расчёт NFP всех повёрнутых вариантов заранее
+        self.rotations = kw.get("rotations", 1)
+        if kw.get("precompute_rotations", False) and self.rotations > 1:
+            self.precomputeRotations(self.rotations)
+
+    def openStore(self, path):
+        """Хранилище по пути, одно и то же для истории и записи"""
+        if self.history is not None and self.history.path == path:
+            return self.history
+        if self.nfp_store is not None and self.nfp_store.path == path:
+            return self.nfp_store
+        return NFPStore(path)
+
     def loadHistory(self):
-        if not self.history:
-            if not self.history_path:
-                path = "history/nfp.csv"
-            else:
-                path = self.history_path
-            df = pd.read_csv(path, header=None)
-        else:
-            df = self.history
-        for index in range(df.shape[0]):
-            i = self.getPolyIndex(json.loads(df[0][index]))
-            j = self.getPolyIndex(json.loads(df[1][index]))
-            if i >= 0 and j >= 0:
-                self.nfp_list[i][j] = json.loads(df[2][index])
-        # print(self.nfp_list)
+        if self.history is None:
+            self.history = self.openStore(self.history_path)
+        for i, poly1 in enumerate(self.polys):
+            for j, poly2 in enumerate(self.polys):
+                nfp = self.history.get(poly1, poly2)
+                if nfp is not None:
+                    self.nfp_list[i][j] = get_slide(nfp, -poly1[0][0], -poly1[0][1])
+
+    def getOffsetPolygon(self, poly):
+        """Контур poly с отступом spacing / 2 в положении poly (poly, если зазора нет)"""
+        if not self.spacing:
+            return poly
+        shape_id = get_shape_id(poly)
+        if shape_id not in self._offsets:
+            offset = offset_polygon(poly, self.spacing / 2, self.spacing_tolerance)
+            self._offsets[shape_id] = get_slide(offset, -poly[0][0], -poly[0][1])
+        return get_slide(self._offsets[shape_id], poly[0][0], poly[0][1])
 
     # 获得一个形状的index
     def getPolyIndex(self, target):
-        area = int(Polygon(target).area)
-        first_vec = [target[1][0] - target[0][0], target[1][1] - target[0][1]]
-        area_index = get_index_multi(area, self.area_list)
-        if len(area_index) == 1:  # 只有一个的情况
-            return area_index[0]
-        else:
-            vec_index = get_index_multi(first_vec, self.first_vec_list)
-            index = [x for x in area_index if x in vec_index]
-            if len(index) == 0:
-                return -1
-            return index[0]  # 一般情况就只有一个了
+        return self.registry.lookup(target)
+
+    def getShapeId(self, poly):
+        """ID формы; новая форма добавляется в nfp_list"""
+        shape_id = self.registry.add_shape(poly)
+        self._growNFPList()
+        return shape_id
+
+    def getRotatedShapeId(self, shape_id, angle):
+        """ID формы shape_id, повёрнутой на angle; NFP варианта выводятся из исходной формы"""
+        variant_id = self.registry.add_rotation(shape_id, angle)
+        self._growNFPList()
+        return variant_id
+
+    def _growNFPList(self):
+        while not self.lazy and len(self.nfp_list) < len(self.polys):
+            for row in self.nfp_list:
+                row.append(0)
+            self.nfp_list.append([0] * len(self.polys))
+
+    def getMirroredShapeId(self, shape_id):
+        """ID зеркального отражения формы shape_id (отдельная исходная форма реестра)"""
+        mirror_id = self.registry.add_mirror(shape_id)
+        self._growNFPList()
+        return mirror_id
+
+    def precomputeRotations(self, rotations):
+        """Предрасчёт NFP для rotations углов (NestConfig.ROTATIONS: 360 / rotations * k)"""
+        self.precomputeOrientations([360 / rotations * k for k in range(rotations)])
+
+    def precomputeOrientations(self, angles, mirror=False):
+        """
+        Предрасчёт NFP для ориентаций: углов angles и (mirror=True) их
+        зеркальных отражений. NFP(Aα, Bβ) - это NFP(A, B(β-α)), повёрнутый
+        на α, поэтому считаются только пары исходных форм с вариантами по
+        разностям углов. Отражения - исходные формы, их пары с остальными
+        исходными формами тоже считаются; пары двух неотражённых исходных
+        форм остаются getAllNFP.
+        """
+        deltas = sorted({round((b - a) % 360, 6) for a in angles for b in angles} - {0})
+        originals = [shape_id for shape_id in self.registry.ids if shape_id not in self.registry.rotations]
+        base_ids = list(originals)
+        if mirror:
+            for shape_id in originals:
+                mirror_id = self.getMirroredShapeId(shape_id)
+                if mirror_id not in base_ids and mirror_id not in self.registry.rotations:
+                    base_ids.append(mirror_id)
+        variants = {
+            shape_id: [self.getRotatedShapeId(shape_id, delta) for delta in deltas]
+            for shape_id in base_ids
+        }
+        pairs = {}  # словарь как упорядоченное множество пар
+        for id1 in base_ids:
+            i = self.registry.index_of(id1)
+            for id2 in base_ids:
+                targets = list(variants[id2])
+                if id1 not in originals or id2 not in originals:
+                    targets.append(id2)
+                for variant_id in targets:
+                    j = self.registry.index_of(variant_id)
+                    if not self.hasStoredNFP(i, j):
+                        pairs[(i, j)] = True
+        self.getAllNFP(list(pairs))
 
     # 获得所有的形状
-    def getAllNFP(self):
-        for i, poly1 in enumerate(self.polys):
-            for j, poly2 in enumerate(self.polys):
-                nfp_object = NFP(poly1, poly2)
-                if nfp_object.error < 0:
-                    print(f"Error happened in NFP calculation for poly {i} and {j}")
-                nfp = nfp_object.nfp
-                # NFP(poly1, poly2).showResult()
-                self.nfp_list[i][j] = get_slide(
-                    nfp, -self.centroid_list[i][0], -self.centroid_list[i][1]
-                )
+    def getAllNFP(self, pairs=None):
+        if pairs is None:
+            if self.lazy:
+                return  # в ленивом режиме NFP считаются по запросу
+            pairs = [
+                (i, j)
+                for i in range(len(self.polys))
+                for j in range(len(self.polys))
+                if self.nfp_list[i][j] == 0
+            ]
+        if self.parallel and self.workers > 1 and len(pairs) >= self.parallel_min_pairs:
+            results = self.iterParallelNFP(pairs)
+        else:
+            results = self.iterSerialNFP(pairs)
+        for i, j, nfp, error, path in results:
+            self.nfp_paths[path] += 1
+            if error < 0:
+                print(f"Error happened in NFP calculation for poly {i} and {j}")
+            # NFP(poly1, poly2).showResult()
+            self.setStoredNFP(i, j, get_slide(nfp, -self.polys[i][0][0], -self.polys[i][0][1]))
+            if self.store_nfp == True and self.lazy:
+                self.getStore().put(self.polys[i], self.polys[j], nfp)
         if self.store_nfp == True:
             self.storeNFP()
 
+    def iterSerialNFP(self, pairs):
+        for i, j in pairs:
+            nfp_object = self.computeTypeNFP(i, j)
+            yield i, j, nfp_object.nfp, nfp_object.error, nfp_object.path
+
+    def iterParallelNFP(self, pairs):
+        """Расчёт пар в пуле процессов, результаты приходят в исходном порядке пар"""
+        workers = min(self.workers, len(pairs))
+        chunk_size = self.chunk_size or max(1, len(pairs) // (workers * 4))
+        chunks = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_nfp_worker,
+            initargs=(self.polys, self.registry.kinds, self.nfp_engine),
+        ) as executor:
+            for chunk_result in executor.map(_nfp_chunk_worker, chunks):
+                yield from chunk_result
+
+    def computeNFP(self, poly1, poly2):
+        """Расчёт NFP выбранной реализацией"""
+        return compute_nfp(poly1, poly2, self.nfp_engine)
+
+    def computeTypeNFP(self, i, j):
+        """Расчёт NFP пары типов с учётом их классификации из реестра"""
+        kinds = (self.registry.kinds[i], self.registry.kinds[j])
+        return compute_nfp(self.polys[i], self.polys[j], self.nfp_engine, kinds)
+
+    def pathStats(self):
+        """Сколько пар посчитано каждым путём"""
+        return dict(self.nfp_paths)
+
+    def getStore(self):
+        if self.nfp_store is None:
+            self.nfp_store = self.openStore(self.store_path)
+        return self.nfp_store
+
     def storeNFP(self):
-        if self.store_path == None:
-            path = "history/nfp.csv"
-        else:
-            path = self.store_path
-        with open(path, "a+") as csvfile:
-            writer = csv.writer(csvfile)
-            for i in range(len(self.polys)):
-                for j in range(len(self.polys)):
-                    writer.writerows(
-                        [[self.polys[i], self.polys[j], self.nfp_list[i][j]]]
-                    )
+        store = self.getStore()
+        if self.lazy:
+            return  # каждый NFP записывается в getDirectNFP сразу после расчёта
+        for i in range(len(self.polys)):
+            for j in range(len(self.polys)):
+                if self.nfp_list[i][j] == 0:
+                    continue
+                nfp = get_slide(self.nfp_list[i][j], self.polys[i][0][0], self.polys[i][0][1])
+                store.put(self.polys[i], self.polys[j], nfp)
 
     # 输入形状获得NFP
     def getDirectNFP(self, poly1, poly2, **kw):
-        # Добавляем кэширование на основе геометрических характеристик
-        cache_key = self._get_cache_key(poly1, poly2)
-        if cache_key in self._nfp_cache:
-            return self._nfp_cache[cache_key]
-        
-        if "index" in kw:
+        if "ids" in kw:  # ID форм из реестра - без повторного хэширования
+            i = self.registry.index_of(kw["ids"][0])
+            j = self.registry.index_of(kw["ids"][1])
+        elif "index" in kw:
             i = kw["index"][0]
             j = kw["index"][1]
-            centroid = get_point(Polygon(self.polys[i]).centroid)
         else:
             i = self.getPolyIndex(poly1)
             j = self.getPolyIndex(poly2)
-            centroid = get_point(Polygon(poly1).centroid)
+        if i < 0 or j < 0:
+            i = self.registry.index_of(self.getShapeId(poly1))
+            j = self.registry.index_of(self.getShapeId(poly2))
+
+        top = self._top_index(poly2)
+        cache_key = (i, j, top)
+        shift = self._nfp_cache.get(cache_key)
+        if shift is None:
+            # Опорная вершина (check_top) poly2 может отличаться от вершины представителя
+            # при равных y, округлённых по-разному после поворота
+            ref = self._top_index(self.polys[j])
+            poly = self.polys[j]
+            shift = (poly[top][0] - poly[ref][0], poly[top][1] - poly[ref][1])
+            self._nfp_cache.put(cache_key, shift)
+        return get_slide(self.getTypeNFP(i, j), poly1[0][0] + shift[0], poly1[0][1] + shift[1])
 
-        if self.nfp_list[i][j] == 0:
+    def getTypeNFP(self, i, j):
+        """NFP пары типов относительно первой вершины polys[i], при необходимости расчёт"""
+        stored = self.getStoredNFP(i, j)
+        if stored is not None:
+            return stored
+        base_i, alpha = self.registry.base_of(self.registry.ids[i])
+        if alpha != 0:
+            # NFP(Aα, Bβ) = Rα·NFP(A, B(β-α))
+            base_j, beta = self.registry.base_of(self.registry.ids[j])
+            k = self.registry.index_of(self.getRotatedShapeId(base_j, beta - alpha))
+            stored = self._get_rotated_nfp(
+                self.getTypeNFP(self.registry.index_of(base_i), k), alpha, k, j
+            )
+            self.nfp_paths["rotated"] += 1
+        elif i != j and self.hasStoredNFP(j, i):
             # Добавляем проверку на симметричность NFP
-            if i != j and self.nfp_list[j][i] != 0:
-                nfp = self._get_symmetric_nfp(self.nfp_list[j][i])
-            else:
-                nfp = NFP(poly1, poly2).nfp
-            
-            self._nfp_cache[cache_key] = nfp
-            
+            stored = self._get_symmetric_nfp(i, j)
+            self.nfp_paths["symmetric"] += 1
+        else:
+            poly1, poly2 = self.polys[i], self.polys[j]
+            nfp_object = self.computeTypeNFP(i, j)
+            self.nfp_paths[nfp_object.path] += 1
+            nfp = nfp_object.nfp
+            stored = get_slide(nfp, -poly1[0][0], -poly1[0][1])
             if self.store_nfp:
-                with open("history/nfp.csv", "a+") as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerows([[poly1, poly2, nfp]])
-            return nfp
+                self.getStore().put(poly1, poly2, nfp)
+        self.setStoredNFP(i, j, stored)
+        return stored
+
+    def hasStoredNFP(self, i, j):
+        if self.lazy:
+            return (i, j) in self.nfp_cache
+        return self.nfp_list[i][j] != 0
+
+    def getStoredNFP(self, i, j):
+        """NFP пары типов относительно первой вершины polys[i] или None"""
+        if self.lazy:
+            nfp = self.nfp_cache.get((i, j))
+        else:
+            nfp = self.nfp_list[i][j] or None
+        if nfp is None and self.history is not None:
+            # Типы, добавленные после загрузки истории (например, повёрнутые)
+            arr = self.history.get_array(nfp_key(self.polys[i], self.polys[j]))
+            if arr is not None:
+                nfp = arr.tolist()
+                self.setStoredNFP(i, j, nfp)
+        return nfp
+
+    def setStoredNFP(self, i, j, nfp):
+        if self.lazy:
+            self.nfp_cache.put((i, j), nfp)
+        else:
+            self.nfp_list[i][j] = nfp
+
+    def exportNFPs(self, shape_ids=None):
+        """
+        Посчитанные NFP пар типов {(ID1, ID2): NFP относительно первой вершины},
+        только для пар из shape_ids, если заданы
+        """
+        if self.lazy:
+            items = self.nfp_cache.items()
         else:
-            return get_slide(self.nfp_list[i][j], centroid[0], centroid[1])
+            items = [
+                ((i, j), nfp)
+                for i, row in enumerate(self.nfp_list)
+                for j, nfp in enumerate(row)
+                if nfp != 0
+            ]
+        ids = self.registry.ids
+        wanted = None if shape_ids is None else set(shape_ids)
+        return {
+            (ids[i], ids[j]): nfp
+            for (i, j), nfp in items
+            if wanted is None or (ids[i] in wanted and ids[j] in wanted)
+        }
+
+    def importNFPs(self, nfps):
+        """Добавить NFP из exportNFPs для зарегистрированных типов"""
+        for (id1, id2), nfp in nfps.items():
+            i, j = self.registry.index_of(id1), self.registry.index_of(id2)
+            if i >= 0 and j >= 0:
+                self.setStoredNFP(i, j, nfp)
+
+    def cacheStats(self):
+        """
+        Счётчики кэшей: "direct" - готовые NFP getDirectNFP,
+        "matrix" - LRU ленивого режима (None в обычном режиме)
+        """
+        return {
+            "direct": self._nfp_cache.stats(),
+            "matrix": None if self.nfp_cache is None else self.nfp_cache.stats(),
+        }
+
+    @staticmethod
+    def _top_index(poly):
+        """Индекс check_top без построения shapely-полигона"""
+        return int(np.argmax(np.asarray(poly, dtype=np.float64)[:, 1]))
 
-    def _get_cache_key(self, poly1, poly2):
-        """Генерация ключа кэша на основе геометрических характеристик"""
-        p1_area = Polygon(poly1).area
-        p2_area = Polygon(poly2).area
-        return f"{p1_area:.6f}_{p2_area:.6f}"
+    def _get_rotated_nfp(self, nfp, alpha, k, j):
+        """
+        NFP типа k (= B(β-α)), повёрнутый на alpha, как NFP для типа j (= Bβ):
+        опорная вершина переносится с check_top(k) на check_top(j) до поворота.
+        """
+        poly_k = self.polys[k]
+        ref, target = self._top_index(poly_k), self._top_index(self.polys[j])
+        offset = np.asarray(poly_k[target], dtype=np.float64) - poly_k[ref]
+        cos_a, sin_a = rotation_cos_sin(alpha)
+        rotation = np.array([[cos_a, sin_a], [-sin_a, cos_a]])
+        return ((np.asarray(nfp, dtype=np.float64) + offset) @ rotation).tolist()
 
-    def _get_symmetric_nfp(self, nfp):
-        """Получение симметричного NFP"""
-        return [[-p[0], -p[1]] for p in nfp]
+    def _get_symmetric_nfp(self, i, j):
+        """
+        NFP(i, j) из уже посчитанного NFP(j, i): положение q опорной точки i
+        относительно j переходит в r_i + r_j - q (r - опорные точки check_top
+        относительно первой вершины), результат - относительно первой вершины polys[i].
+        """
+        poly_i, poly_j = self.polys[i], self.polys[j]
+        top_i, top_j = poly_i[check_top(poly_i)], poly_j[check_top(poly_j)]
+        x = top_i[0] - poly_i[0][0] + top_j[0] - poly_j[0][0]
+        y = top_i[1] - poly_i[0][1] + top_j[1] - poly_j[0][1]
+        return [[x - p[0], y - p[1]] for p in self.getStoredNFP(j, i)]
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from util.polygon_util import shape_digest
+
+try:  # блокировка файла для одновременной записи из нескольких процессов
+    import fcntl
+except ImportError:  # Windows: запись одним os.write в режиме append
+    fcntl = None
+
+# Версия 2: ключи по canonical_polygon со сдвигом сетки GRID_PHASE,
+# ключи версии 1 с ними не совпадают
+MAGIC = b"NFPSTOR2"
+# ключ пары (16 байт), количество точек, crc32 координат
+RECORD_HEADER = struct.Struct("<16sII")
+
+
+def nfp_key(poly1, poly2, angle=0):
+    """
+    Ключ NFP: хэш форм обоих полигонов (без учёта положения) и угла поворота.
+    """
+    angle_bytes = struct.pack("<d", round(float(angle) % 360, 6))
+    return hashlib.blake2b(
+        shape_digest(poly1) + shape_digest(poly2) + angle_bytes, digest_size=16
+    ).digest()
+
+
+class NFPStore(object):
+    """
+    Бинарное хранилище NFP с адресацией по содержимому.
+
+    Файл - заголовок MAGIC и записи [ключ, n, crc32, n*2 float64] только на
+    дозапись. NFP хранится относительно первой вершины poly1, поэтому
+    подходит для любых сдвинутых копий той же пары форм. Индекс ключ -> смещение
+    строится при открытии, координаты читаются из memory-mapped файла
+    (отображение заменяется при refresh, когда файл вырос).
+    Запись из нескольких процессов безопасна: каждая запись добавляется одним
+    вызовом write под блокировкой, оборванные записи при чтении пропускаются.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(MAGIC)
+        self.index = {}
+        self._pending = {}  # записанные этим процессом, но ещё не отображённые
+        self._mmap = None
+        self._scanned = len(MAGIC)
+        self.refresh()
+
+    def __len__(self):
+        return len(self.index.keys() | self._pending.keys())
+
+    def __contains__(self, key):
+        return key in self.index or key in self._pending
+
+    def refresh(self):
+        """Подхватить записи, добавленные другими процессами"""
+        size = os.path.getsize(self.path)
+        if self._mmap is not None and size == len(self._mmap):
+            return
+        with open(self.path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            if magic[:7] == MAGIC[:7] and magic != MAGIC:
+                raise ValueError(
+                    f"{self.path}: хранилище NFP старой версии, ключи форм не совпадут - "
+                    "удалите файл или импортируйте историю заново"
+                )
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} не является хранилищем NFP")
+            if size <= len(MAGIC):
+                return
+            previous, self._mmap = self._mmap, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # get_array отдаёт копии, поэтому на старое отображение никто не ссылается
+        if previous is not None:
+            previous.close()
+        self._scan()
+
+    def _scan(self):
+        data = self._mmap
+        offset = self._scanned
+        while offset + RECORD_HEADER.size <= len(data):
+            key, count, crc = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            end = start + count * 16
+            if end > len(data) or zlib.crc32(data[start:end]) != crc:
+                break  # запись ещё дописывается другим процессом
+            self.index[key] = (start, count)
+            self._pending.pop(key, None)
+            offset = end
+        self._scanned = offset
+
+    def get_array(self, key):
+        """NFP по ключу как массив (n, 2) - копия из отображённого файла - или None"""
+        item = self.index.get(key)
+        if item is None:
+            return self._pending.get(key)
+        start, count = item
+        return np.frombuffer(self._mmap, dtype="<f8", count=count * 2, offset=start).reshape(-1, 2).copy()
+
+    def get(self, poly1, poly2, angle=0):
+        """NFP для конкретного положения poly1 или None"""
+        arr = self.get_array(nfp_key(poly1, poly2, angle))
+        if arr is None:
+            return None
+        return (arr + np.asarray(poly1[0], dtype=np.float64)).tolist()
+
+    def put(self, poly1, poly2, nfp, angle=0):
+        """Сохранить NFP, посчитанный для poly1 в его текущем положении"""
+        key = nfp_key(poly1, poly2, angle)
+        if key in self:
+            return key
+        arr = np.asarray(nfp, dtype="<f8").reshape(-1, 2) - np.asarray(poly1[0], dtype="<f8")
+        self.put_array(key, arr)
+        return key
+
+    def put_array(self, key, arr):
+        payload = np.ascontiguousarray(arr, dtype="<f8").tobytes()
+        record = RECORD_HEADER.pack(key, len(payload) // 16, zlib.crc32(payload)) + payload
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, record)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._pending[key] = np.frombuffer(payload, dtype="<f8").reshape(-1, 2)
+
+
+def import_csv_history(csv_path, store):
+    """
+    Перенос старой истории history/nfp.csv (poly1, poly2, nfp в JSON) в хранилище.
+    NFP в CSV записаны относительно центроида poly1, как их читал loadHistory.
+    """
+    import pandas as pd
+    from shapely.geometry import Polygon
+
+    df = pd.read_csv(csv_path, header=None)
+    for index in range(df.shape[0]):
+        poly1 = json.loads(df[0][index])
+        centroid = Polygon(poly1).centroid
+        nfp = [[x + centroid.x, y + centroid.y] for x, y in json.loads(df[2][index])]
+        store.put(poly1, json.loads(df[1][index]), nfp)
+    return store
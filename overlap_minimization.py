@@ -0,0 +1,230 @@
+import random
+import time
+
+import numpy as np
+import shapely
+
+from spatial_index import PlacedIndex
+from util.polygon_util import penetration_depths
+
+# Уменьшение суммарной глубины меньше этого - не улучшение
+TOLERANCE = 1e-9
+# Допустимая площадь перекрытия по умолчанию - доля площади меньшей детали
+OVERLAP_TOLERANCE = 1e-6
+
+
+class OverlapMinimization(object):
+    """
+    Уплотнение раскладки BottomLeftFill на полосе: длина сокращается на
+    долю shrink, детали, вышедшие за новую длину, сдвигаются внутрь, после
+    чего перекрытия устраняются локальным поиском - деталь с перекрытием
+    переносится в точку с минимальной суммарной глубиной проникновения в NFP
+    соседей (NFP.getDepth, util.polygon_util.penetration_depths). В локальном
+    минимуме растёт штраф самой глубокой пары (направленный локальный поиск).
+
+    Соседи - детали из пространственного индекса, которых деталь может
+    коснуться из окна window (в размерах детали) вокруг неё или с горизонтали
+    и вертикали через опорную точку. Кандидаты - вершины свободной от NFP
+    части окна, вершины NFP, ближайшие точки их границ, samples случайных
+    точек окна и line_samples точек на горизонтали и вертикали, все внутри
+    IFR; глубины всех кандидатов по всем соседям считаются одной матрицей.
+
+    Если за max_passes проходов перекрытия не исчезли, раскладка
+    возвращается к последней допустимой, а shrink уменьшается вдвое; поиск
+    заканчивается при shrink < min_shrink, после max_iterations сокращений
+    или по истечении time_limit секунд.
+
+    blf по окончании содержит лучшую раскладку, его лист - ровно её длина.
+    trajectory - список (секунды от начала, длина) для каждого улучшения.
+    """
+
+    def __init__(self, blf, **kw):
+        self.blf = blf
+        self.nfp_assistant = blf.nfp_assistant
+        self.height = blf.height
+        self.shrink_ratio = kw.get("shrink", 0.02)
+        self.min_shrink = kw.get("min_shrink", 0.002)
+        self.max_passes = kw.get("max_passes", 200)
+        self.max_iterations = kw.get("max_iterations", 100)
+        self.time_limit = kw.get("time_limit")
+        self.window = kw.get("window", 1.0)
+        self.samples = kw.get("samples", 8)
+        self.line_samples = kw.get("line_samples", 32)
+        self.random = random.Random(kw.get("seed", 0))
+
+        # Длина не меньше самой широкой детали и площади деталей / height
+        self.lower_bound = max(
+            [part.bounds[2] - part.bounds[0] for part in self.parts]
+            + [sum(part.area for part in self.parts) / self.height]
+        )
+        # Перекрытия меньше этой площади - погрешность NFP, а не пересечение
+        self.overlap_area = kw.get(
+            "overlap_area", OVERLAP_TOLERANCE * min((part.area for part in self.parts), default=0)
+        )
+        self.start_time = time.time()
+        self.length = blf.getLength()
+        self.trajectory = []
+        self.iterations = 0
+        self.moves = 0
+        self.penalties = {}  # (i, j) -> штраф пары за перекрытие
+        self.stuck = []  # (полезность штрафа, пара) деталей без улучшения за проход
+        self.index = PlacedIndex()
+        for k, part in enumerate(self.parts):
+            self.index.add(k, part.placed_geometry())
+        self.record()
+        self.run()
+
+    @property
+    def parts(self):
+        return self.blf.parts
+
+    @property
+    def layout(self):
+        return self.blf.layout
+
+    def record(self):
+        self.trajectory.append((time.time() - self.start_time, float(self.length)))
+
+    def timeExceeded(self):
+        return self.time_limit is not None and time.time() - self.start_time > self.time_limit
+
+    def run(self):
+        best = [part.offset.copy() for part in self.parts]
+        shrink = self.shrink_ratio
+        while shrink >= self.min_shrink and self.iterations < self.max_iterations:
+            if self.timeExceeded():
+                break
+            width = max(self.length * (1 - shrink), self.lower_bound)
+            if width >= self.length:
+                break
+            self.iterations += 1
+            self.blf.setWidth(width)
+            self.squeeze(width)
+            if self.resolve():
+                self.length = self.layout.length()
+                best = [part.offset.copy() for part in self.parts]
+                self.record()
+            else:
+                self.setOffsets(best)
+                shrink /= 2
+        self.setOffsets(best)
+        self.blf.setWidth(self.length)
+        self.blf.reindex()
+
+    def setOffsets(self, offsets):
+        for k, (part, offset) in enumerate(zip(self.parts, offsets)):
+            if not np.array_equal(part.offset, offset):
+                part.offset = offset.copy()
+                self.index.add(k, part.placed_geometry())
+
+    def squeeze(self, width):
+        """Сдвинуть влево детали, выходящие за длину width"""
+        for k, part in enumerate(self.parts):
+            excess = part.placed_bounds[2] - width
+            if excess > 0:
+                part.translate(-excess, 0)
+                self.index.add(k, part.placed_geometry())
+
+    def overlapping(self):
+        return [
+            k for k in range(len(self.parts))
+            if self.index.overlaps(self.index.geoms[k], exclude=k, tolerance=self.overlap_area)
+        ]
+
+    def resolve(self):
+        """Устранить перекрытия не более чем за max_passes проходов"""
+        self.penalties = {}
+        for _ in range(self.max_passes):
+            # Перемещения прошлого прохода - одной перестройкой дерева
+            self.index.flush()
+            keys = self.overlapping()
+            if not keys:
+                return True
+            if self.timeExceeded():
+                return False
+            self.random.shuffle(keys)
+            self.stuck = []
+            for k in keys:
+                self.movePart(k)
+            if self.stuck:
+                self.penalize()
+        return not self.overlapping()
+
+    def penalize(self):
+        """
+        Направленный локальный поиск: в локальном минимуме штраф пары с
+        наибольшей глубиной / (1 + штраф) растёт, её перекрытие дороже
+        """
+        _, pair = max(self.stuck)
+        self.penalties[pair] = self.penalties.get(pair, 0) + 1
+
+    def movePart(self, k):
+        """Перенести деталь k в точку с минимальной суммарной глубиной проникновения"""
+        part = self.parts[k]
+        min_x, min_y, max_x, max_y = part.bounds
+        window = self.window * max(max_x - min_x, max_y - min_y)
+        ifr = self.blf.getInnerFitRectangle(part)
+        ref = part.reference
+        low = np.maximum(ifr[0], ref - window)
+        high = np.maximum(np.minimum(ifr[2], ref + window), low)
+
+        # Соседи - все детали, которые деталь может задеть из любой точки окна
+        # и со всей горизонтали и вертикали через ref
+        pminx, pminy, pmaxx, pmaxy = part.placed_bounds
+        area = shapely.union_all([
+            shapely.box(pminx - window, pminy - window, pmaxx + window, pmaxy + window),
+            shapely.box(0, pminy, self.blf.width, pmaxy),
+            shapely.box(pminx, 0, pmaxx, self.height),
+        ])
+        neighbours = [i for i in self.index.query(area) if i != k]
+        if not neighbours:
+            return False
+        points = part.points
+        nfps = np.array([
+            shapely.polygons(self.nfp_assistant.getDirectNFP(
+                self.parts[i].points, points, ids=(self.parts[i].shape_id, part.shape_id)
+            ))
+            for i in neighbours
+        ], dtype=object)
+        shapely.prepare(nfps)
+
+        # Вершины NFP, ближайшие к ref точки их границ (кратчайший выход) и сама ref
+        boundaries = shapely.boundary(nfps)
+        nearest = shapely.line_interpolate_point(
+            boundaries, shapely.line_locate_point(boundaries, shapely.points(ref))
+        )
+        # Вершины свободной области окна (как у BottomLeftFill): точки без перекрытия
+        free = shapely.difference(shapely.box(*low, *high), shapely.union_all(nfps))
+        vertices = np.concatenate([
+            shapely.get_coordinates(free), shapely.get_coordinates(nfps),
+            shapely.get_coordinates(nearest), [ref],
+        ])
+        # Случайные точки окна и точки на горизонтали и вертикали через ref
+        samples = np.array([
+            [self.random.uniform(low[0], high[0]), self.random.uniform(low[1], high[1])]
+            for _ in range(self.samples)
+        ]).reshape(-1, 2)
+        steps = np.linspace(0, 1, self.line_samples)
+        lines = np.concatenate([
+            np.column_stack([ifr[0][0] + steps * (ifr[2][0] - ifr[0][0]), np.full_like(steps, ref[1])]),
+            np.column_stack([np.full_like(steps, ref[0]), ifr[0][1] + steps * (ifr[2][1] - ifr[0][1])]),
+        ])
+        candidates = np.concatenate([np.clip(np.concatenate([vertices, samples]), low, high), lines])
+        pairs = [(min(i, k), max(i, k)) for i in neighbours]
+        weights = 1 + np.array([self.penalties.get(pair, 0) for pair in pairs])
+        depths = penetration_depths(nfps, candidates) @ weights
+        current = penetration_depths(nfps, [ref])[0]
+        # Меньшая взвешенная глубина, при равной - левее и ниже
+        best = np.lexsort((candidates[:, 1], candidates[:, 0], np.round(depths, 9)))[0]
+        if depths[best] >= current @ weights - TOLERANCE:
+            worst = int(np.argmax(current / weights))
+            self.stuck.append((current[worst] / weights[worst], pairs[worst]))
+            return False
+        part.translate(*(candidates[best] - ref))
+        self.index.add(k, part.placed_geometry())
+        self.moves += 1
+        return True
+
+    def utilization(self):
+        """Доля площади полосы длиной length, занятая деталями"""
+        return self.layout.utilization(self.length)
@@ -0,0 +1,103 @@
+from collections import Counter
+
+from util.minkowski_util import classify_polygon
+from util.polygon_util import mirror_polygon, rotate_polygon, shape_digest
+
+
+def get_shape_id(poly):
+    """Стабильный идентификатор формы: хэш геометрии без учёта положения"""
+    return shape_digest(poly).hex()
+
+
+class PartRegistry(object):
+    """
+    Реестр типов деталей. Каждой различной форме назначается стабильный ID,
+    каждая размещаемая копия (экземпляр) ссылается на ID своей формы.
+    Сдвинутые копии одной детали - один тип, поэтому NFP считаются по типам.
+    """
+
+    def __init__(self, polys=None):
+        self.shapes = []  # полигон-представитель каждого типа
+        self.kinds = []  # "rectangle", "convex" или "concave" для каждого типа
+        self.ids = []  # ID типов в порядке появления
+        self.instances = []  # ID типа для каждого экземпляра
+        self._index = {}  # ID -> номер типа
+        self.rotations = {}  # ID повёрнутого варианта -> (ID исходной формы, угол)
+        self._variants = {}  # (ID исходной формы, угол) -> ID варианта
+        self.mirrors = {}  # ID исходной формы <-> ID её зеркального отражения
+        if polys is not None:
+            for poly in polys:
+                self.add_instance(poly)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, shape_id):
+        return shape_id in self._index
+
+    def add_shape(self, poly):
+        """Зарегистрировать форму (без экземпляра), вернуть её ID"""
+        shape_id = get_shape_id(poly)
+        if shape_id not in self._index:
+            self._index[shape_id] = len(self.ids)
+            self.ids.append(shape_id)
+            self.shapes.append([[pt[0], pt[1]] for pt in poly])
+            self.kinds.append(classify_polygon(poly))
+        return shape_id
+
+    def add_instance(self, poly):
+        """Зарегистрировать экземпляр детали, вернуть ID его формы"""
+        shape_id = self.add_shape(poly)
+        self.instances.append(shape_id)
+        return shape_id
+
+    def add_rotation(self, shape_id, angle):
+        """
+        Зарегистрировать форму shape_id, повёрнутую на angle градусов
+        (поворот уже повёрнутого варианта складывает углы), вернуть ID варианта.
+        """
+        base_id, base_angle = self.base_of(shape_id)
+        angle = round((base_angle + angle) % 360, 6) % 360
+        if angle == 0:
+            return base_id
+        key = (base_id, angle)
+        if key not in self._variants:
+            rotated = rotate_polygon(self.get(base_id), angle)
+            variant_id = get_shape_id(rotated)
+            if variant_id not in self._index:
+                self.rotations[variant_id] = key
+            self.add_shape(rotated)
+            self._variants[key] = variant_id
+        return self._variants[key]
+
+    def add_mirror(self, shape_id):
+        """
+        Зарегистрировать зеркальное отражение формы shape_id, вернуть его ID.
+        Отражение исходной формы - отдельная исходная форма (её NFP считаются,
+        а не выводятся); отражение варианта с углом α - поворот отражения на -α.
+        """
+        base_id, angle = self.base_of(shape_id)
+        if base_id not in self.mirrors:
+            mirror_id = self.add_shape(mirror_polygon(self.get(base_id)))
+            self.mirrors[base_id] = mirror_id
+            self.mirrors.setdefault(mirror_id, base_id)
+        return self.add_rotation(self.mirrors[base_id], -angle)
+
+    def base_of(self, shape_id):
+        """(ID исходной формы, угол поворота) для варианта, (shape_id, 0) для исходной"""
+        return self.rotations.get(shape_id, (shape_id, 0))
+
+    def index_of(self, shape_id):
+        """Номер типа по ID, -1 если форма не зарегистрирована"""
+        return self._index.get(shape_id, -1)
+
+    def lookup(self, poly):
+        """Номер типа по полигону, -1 если форма не зарегистрирована"""
+        return self._index.get(get_shape_id(poly), -1)
+
+    def get(self, shape_id):
+        return self.shapes[self._index[shape_id]]
+
+    def quantities(self):
+        """Количество экземпляров каждого типа"""
+        return Counter(self.instances)
@@ -61,7 +61,7 @@ class NestConfig:
         self.POPULATION_SIZE = 25  # 30 количество геномов ()
         self.MUTA_RATE = 15  # вероятность мутации (из-за random в методе GA.mutate())
         self.ROTATIONS = 4  # выбор вращения, 1: нет вращения
-        self.GROUP_ROTATION = False  # вращение происходит для всех объектов группы по outer_id
+        self.GROUP_ROTATION = False  # общий угол поворота у всех копий одной формы (одинаковый ID формы, get_shape_id)
 
         # разные размеры рабочей области
         self.BIN_HEIGHT = 1380
@@ -0,0 +1,105 @@
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+# Пересечения меньшей площади считаются касанием
+OVERLAP_AREA = 1e-10
+
+
+class PlacedIndex(object):
+    """
+    Пространственный индекс размещённых деталей.
+
+    Геометрии хранятся подготовленными (shapely.prepare). Основная часть лежит
+    в STRtree, новые детали - в коротком списке, который проверяется по
+    ограничивающим прямоугольникам. Удалённые и перемещённые детали остаются
+    в дереве помеченными (запросы их пропускают). Дерево перестраивается,
+    когда новых и помеченных набирается четверть дерева, или по flush, поэтому
+    добавление и перемещение амортизированно дешёвые.
+    """
+
+    def __init__(self):
+        self.geoms = {}  # ключ детали -> shapely Polygon
+        self._tree = None
+        self._tree_keys = []
+        self._pending = []  # ключи, ещё не попавшие в дерево
+        self._stale = set()  # ключи дерева с удалённой или заменённой геометрией
+
+    def __len__(self):
+        return len(self.geoms)
+
+    def __contains__(self, key):
+        return key in self.geoms
+
+    def add(self, key, geom):
+        if key in self.geoms:
+            self.remove(key)
+        shapely.prepare(geom)
+        self.geoms[key] = geom
+        self._pending.append(key)
+        if len(self._pending) + len(self._stale) > max(16, len(self._tree_keys) // 4):
+            self._rebuild()
+        return geom
+
+    def remove(self, key):
+        self.geoms.pop(key)
+        if key in self._pending:
+            self._pending.remove(key)
+        else:
+            self._stale.add(key)
+
+    def flush(self):
+        """Перестроить дерево, если есть новые или помеченные детали"""
+        if self._pending or self._stale:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._tree_keys = list(self.geoms)
+        self._pending = []
+        self._stale = set()
+        self._tree = STRtree([self.geoms[key] for key in self._tree_keys]) if self._tree_keys else None
+
+    def query(self, geom):
+        """Ключи деталей, пересекающих geom (включая касание)"""
+        keys = []
+        if self._tree is not None:
+            keys = [self._tree_keys[k] for k in self._tree.query(geom, predicate="intersects")]
+            if self._stale:
+                keys = [key for key in keys if key not in self._stale]
+        if self._pending:
+            pending = [self.geoms[key] for key in self._pending]
+            hits = shapely.intersects(pending, geom)
+            keys.extend(key for key, hit in zip(self._pending, hits) if hit)
+        return keys
+
+    def overlaps(self, geom, exclude=None, tolerance=OVERLAP_AREA):
+        """Пересекается ли geom с какой-либо деталью по площади больше tolerance"""
+        keys = [key for key in self.query(geom) if key != exclude]
+        if not keys:
+            return False
+        areas = shapely.area(shapely.intersection([self.geoms[key] for key in keys], geom))
+        return bool(np.any(areas > tolerance))
+
+    def overlaps_batch(self, geoms):
+        """overlaps для массива геометрий: одно пакетное обращение к дереву"""
+        geoms = np.asarray(geoms, dtype=object)
+        result = np.zeros(len(geoms), dtype=bool)
+        if not self.geoms or not len(geoms):
+            return result
+        inputs, others = [], []
+        if self._tree is not None:
+            pairs = self._tree.query(geoms, predicate="intersects")
+            if self._stale:
+                live = np.array([self._tree_keys[k] not in self._stale for k in pairs[1]], dtype=bool)
+                pairs = pairs[:, live]
+            inputs.append(pairs[0])
+            others.extend(self.geoms[self._tree_keys[k]] for k in pairs[1])
+        for key in self._pending:
+            hits = np.nonzero(shapely.intersects(geoms, self.geoms[key]))[0]
+            inputs.append(hits)
+            others.extend([self.geoms[key]] * len(hits))
+        inputs = np.concatenate(inputs)
+        if len(inputs):
+            areas = shapely.area(shapely.intersection(geoms[inputs], np.asarray(others, dtype=object)))
+            result[inputs[areas > OVERLAP_AREA]] = True
+        return result
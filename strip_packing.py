@@ -0,0 +1,116 @@
+import time
+
+from bottom_left_fill import BottomLeftFill
+from layout import Part
+from overlap_minimization import OverlapMinimization
+from settings import NestConfig
+
+
+class StripPacking(object):
+    """
+    Раскладка на полосу (рулон) высоты height с минимальной длиной по x.
+
+    Начальная раскладка строится BottomLeftFill на заведомо достаточной
+    длине, затем длина ищется бисекцией между нижней оценкой и лучшей
+    найденной: каждая попытка - BottomLeftFill.resize с тёплым стартом от
+    лучшей раскладки. Поиск останавливается, когда зазор между оценками
+    меньше min_improvement от лучшей длины, после max_iterations попыток
+    или по истечении time_limit секунд.
+
+    Каждая деталь ставится в лучшей из rotations ориентаций (по умолчанию
+    config.ROTATIONS, NestConfig; 1 - без перебора поворотов).
+
+    При compact=True бисекция продолжается уплотнением OverlapMinimization
+    (сокращение длины с устранением перекрытий по глубине проникновения) в
+    пределах оставшегося time_limit.
+
+    trajectory - список (секунды от начала, лучшая длина) для каждого
+    улучшения. time_limit ограничивает и начальную раскладку: если она не
+    успела разместить все детали, complete=False, длина не сокращается, а
+    length - длина только размещённых деталей (остальные - в blf.unplaced).
+    """
+
+    def __init__(self, height, polygons, nfp_assistant, **kw):
+        self.height = height
+        self.polygons = polygons
+        self.nfp_assistant = nfp_assistant
+        self.min_improvement = kw.get("min_improvement", 0.005)
+        self.max_iterations = kw.get("max_iterations", 30)
+        self.time_limit = kw.get("time_limit")
+        self.compact = kw.get("compact", False)
+        self.config = kw.get("config") or NestConfig()
+        self.rotations = kw.get("rotations", self.config.ROTATIONS)
+
+        parts = [Part(poly) for poly in polygons]
+        self.lower_bound = self.getLowerBound(parts)
+        # Все детали (с отступом spacing) в ряд - заведомо достаточная длина
+        length = kw.get("length") or sum(
+            part.bounds[2] - part.bounds[0]
+            for part in (Part(nfp_assistant.getOffsetPolygon(poly)) for poly in polygons)
+        )
+
+        self.start_time = time.time()
+        self.trajectory = []
+        self.iterations = 0
+        self.blf = BottomLeftFill(
+            length, height, polygons, nfp_assistant,
+            objective=kw.get("objective", "bottom_left"), time_limit=self.time_limit,
+            rotations=self.rotations,
+        )
+        self.length = self.blf.getLength()
+        self.record()
+        # Длина неполной раскладки не учитывает пропущенные детали - не сокращаем
+        self.complete = self.blf.report["complete"]
+        if not self.complete:
+            return
+        self.shrink()
+        if self.compact:
+            self.compaction = self.compactLayout()
+
+    def getLowerBound(self, parts):
+        """Длина не меньше площади деталей / height и меньшей стороны любой детали"""
+        if not parts:
+            return 0
+        area = sum(part.area for part in parts) / self.height
+        side = max(
+            min(part.bounds[2] - part.bounds[0], part.bounds[3] - part.bounds[1]) for part in parts
+        )
+        return max(area, side)
+
+    def record(self):
+        self.trajectory.append((time.time() - self.start_time, float(self.length)))
+
+    def shrink(self):
+        low = self.lower_bound
+        while self.length - low > self.min_improvement * self.length:
+            if self.iterations >= self.max_iterations:
+                break
+            if self.time_limit is not None and time.time() - self.start_time > self.time_limit:
+                break
+            self.iterations += 1
+            width = (low + self.length) / 2
+            if self.blf.resize(width):
+                self.length = self.blf.getLength()
+                self.record()
+            else:
+                low = width
+        # Лист итоговой раскладки - ровно занятая длина
+        self.blf.setWidth(self.length)
+
+    def compactLayout(self):
+        elapsed = time.time() - self.start_time
+        time_limit = None if self.time_limit is None else max(0, self.time_limit - elapsed)
+        compaction = OverlapMinimization(self.blf, time_limit=time_limit)
+        self.trajectory.extend(
+            (elapsed + seconds, length) for seconds, length in compaction.trajectory[1:]
+        )
+        self.length = compaction.length
+        return compaction
+
+    @property
+    def layout(self):
+        return self.blf.layout
+
+    def utilization(self):
+        """Доля площади полосы длиной length, занятая деталями"""
+        return self.layout.utilization(self.length)
@@ -0,0 +1,30 @@
+from bin_packing import BinPacking
+from nfp_assistant import NFPAssistant
+
+SQUARE = [[0, 0], [2, 0], [2, 2], [0, 2]]
+STRIP = [[0, 0], [4, 0], [4, 1], [0, 1]]
+HUGE = [[0, 0], [9, 0], [9, 9], [0, 9]]
+
+
+def test_parts_spread_over_sheets():
+    polys = [SQUARE] * 5 + [STRIP, HUGE]
+    for strategy in ["first_fit", "best_fit"]:
+        packing = BinPacking(4, 4, polys, NFPAssistant(polys), strategy=strategy, parallel=True, workers=2)
+        assert packing.rejected == [6]
+        assert packing.sheet_count == 2
+        placed = sorted(item["index"] for layout in packing.layouts for item in layout)
+        assert placed == [0, 1, 2, 3, 4, 5]
+        assert packing.sheetUtilization() == [1.0, 0.5]
+        assert packing.utilization() == 0.75
+
+
+def test_refined_sheet_matches_layout():
+    short_strip = [[0, 0], [3, 0], [3, 1], [0, 1]]
+    polys = [short_strip, SQUARE, short_strip, short_strip]
+    unrefined = BinPacking(20, 3, polys, NFPAssistant(polys), refine=False, rotations=1)
+    packing = BinPacking(20, 3, polys, NFPAssistant(polys), rotations=1)
+    sheet = packing.sheets[0]
+    assert sheet.getLength() < unrefined.sheets[0].getLength()
+    assert [item["polygon"] for item in packing.layouts[0]] == sheet.polygons
+    assert sheet.getLength() == max(x for item in packing.layouts[0] for x, _ in item["polygon"])
+    assert sorted(packing.assignment[0].values()) == [0, 1, 2, 3]
@@ -0,0 +1,125 @@
+from shapely.geometry import Polygon
+
+from bottom_left_fill import BottomLeftFill
+from nfp_assistant import NFPAssistant
+
+
+def pack(width, height, polys, **kw):
+    polys = [[list(pt) for pt in poly] for poly in polys]
+    return BottomLeftFill(width, height, polys, NFPAssistant(polys), **kw)
+
+
+def test_first_part_placed_in_bottom_left_corner():
+    """Первая деталь ставится в левый нижний угол IFR без перебора сетки"""
+    blf = pack(10, 4, [[[5.5, 7.25], [13.5, 7.25], [13.5, 9.25], [5.5, 9.25]]])
+    assert blf.polygons[0] == [[0, 0], [8, 0], [8, 2], [0, 2]]
+
+
+def test_inner_fit_rectangle_uses_container_width_along_x():
+    """Длинные детали помещаются в контейнер, вытянутый по x"""
+    strip = [[0, 0], [8, 0], [8, 1], [0, 1]]
+    blf = pack(10, 3.5, [strip, strip, strip])
+    assert sorted(poly[0][1] for poly in blf.polygons) == [0, 1, 2]
+    assert blf.getLength() == 8
+
+
+def test_exact_fit_uses_boundary_candidates():
+    """Допустимая область вырождается в отрезок - точка берётся с границы NFP"""
+    strip = [[0, 0], [8, 0], [8, 1], [0, 1]]
+    blf = pack(8, 3, [strip, strip, strip])
+    assert sorted(poly[0][1] for poly in blf.polygons) == [0, 1, 2]
+
+
+def test_placement_objectives():
+    """Каждая цель выбирает свою точку для квадрата рядом с первой деталью"""
+    square = [[0, 0], [2, 0], [2, 2], [0, 2]]
+    post = [[0, 0], [1, 0], [1, 2], [0, 2]]
+    strip = [[0, 0], [6, 0], [6, 1], [0, 1]]
+    expected = {
+        # над стойкой 1x2: левее всего; справа от неё: ближе к (0, 0) и меньше bbox
+        "post": {"bottom_left": (0, 2), "gravity": (1, 0), "min_bbox": (1, 0)},
+        # над полосой 6x1: левее и ближе к (0, 0); справа от неё: меньше bbox
+        "strip": {"bottom_left": (0, 1), "gravity": (0, 1), "min_bbox": (6, 0)},
+    }
+    for name, first in [("post", post), ("strip", strip)]:
+        for objective, corner in expected[name].items():
+            blf = pack(10, 4, [first, square], objective=objective, presorted=True)
+            assert Polygon(blf.polygons[1]).bounds[:2] == corner
+
+
+def test_online_add_remove_snapshot_restore():
+    square = [[0, 0], [2, 0], [2, 2], [0, 2]]
+    blf = BottomLeftFill(4, 2, [], NFPAssistant([square]))
+    first = blf.add(square)
+    second = blf.add([[x + 9, y + 9] for x, y in square])
+    assert first["polygon"] == [[0, 0], [2, 0], [2, 2], [0, 2]]
+    assert second["polygon"] == [[2, 0], [4, 0], [4, 2], [2, 2]]
+    assert blf.add(square) is None  # лист заполнен, раскладка не меняется
+    assert len(blf.parts) == 2 and blf.order == [0, 1]
+
+    state = blf.snapshot()
+    blf.remove(first["key"])
+    assert blf.getLength() == 4
+    third = blf.add(square)
+    assert third["polygon"] == first["polygon"]
+    assert third["key"] not in (first["key"], second["key"])
+    assert blf.order == [1, 2]
+
+    blf.restore(state)
+    assert blf.polygons == [first["polygon"], second["polygon"]]
+    assert blf.order == [0, 1]
+    assert blf.add(square) is None
+
+
+def test_spacing_keeps_gap_and_outputs_original_outline():
+    square = [[0, 0], [2, 0], [2, 2], [0, 2]]
+    polys = [square, [[x + 5, y + 1] for x, y in square], square]
+    assistant = NFPAssistant(polys, spacing=1)
+    blf = BottomLeftFill(10, 4, polys, assistant)
+    assert len(assistant._offsets) == 1  # один контур с отступом на тип
+    assert Polygon(assistant.polys[0]).area > 9
+
+    shapes = [Polygon(poly) for poly in blf.polygons]
+    assert all(abs(shape.area - 4) < 1e-9 for shape in shapes)
+    assert all(
+        shapes[i].distance(shapes[j]) >= 1
+        for i in range(len(shapes)) for j in range(i)
+    )
+
+
+def test_spacing_with_concave_parts_on_orbital_engine():
+    """Контур с отступом лежит в отрицательных координатах - NFP всё равно верные"""
+    l_shape = [[0, 0], [3, 0], [3, 1], [1, 1], [1, 3], [0, 3]]
+    s_shape = [[0, 0], [2, 0], [2, 1], [3, 1], [3, 2], [1, 2], [1, 1], [0, 1]]
+    polys = [l_shape, s_shape, l_shape, s_shape]
+    blf = BottomLeftFill(20, 10, polys, NFPAssistant(polys, spacing=0.1, nfp_engine="orbital"))
+    assert len(blf.parts) == len(polys)
+
+    shapes = [Polygon(poly) for poly in blf.polygons]
+    assert all(
+        shapes[i].distance(shapes[j]) >= 0.1 - 1e-9
+        for i in range(len(shapes)) for j in range(i)
+    )
+
+
+def test_time_budget_returns_partial_layout_with_report():
+    square = [[0, 0], [2, 0], [2, 2], [0, 2]]
+    polys = [square] * 3
+    blf = BottomLeftFill(4, 2, polys, NFPAssistant(polys), time_limit=60)
+    assert len(blf.parts) == 2  # третий квадрат не помещается - без исключения
+    assert blf.unplaced == [2]
+    assert blf.report["complete"] is False and blf.report["timed_out"] is False
+    assert blf.report["placed"] == 2
+
+    blf = BottomLeftFill(4, 2, polys, NFPAssistant(polys), time_limit=0)
+    assert blf.report["timed_out"] is True
+    assert blf.parts == [] and sorted(blf.unplaced) == [0, 1, 2]
+
+
+def test_full_rotation_search_picks_best_orientation():
+    strip = [[0, 0], [3, 0], [3, 1], [0, 1]]
+    assert pack(10, 3, [strip, strip]).getLength() == 3
+    for mirror in [False, True]:
+        blf = pack(10, 3, [strip, strip], rotations=4, mirror=mirror)
+        assert blf.getLength() == 2  # обе полосы стоят вертикально
+        assert len(blf.orientation_set) == (8 if mirror else 4)
@@ -0,0 +1,53 @@
+from decode_cache import DecodeCache, PrefixDecoder
+from genetic_algorithm import decode
+from nfp_assistant import NFPAssistant
+
+SQUARE = [[0, 0], [2, 0], [2, 2], [0, 2]]
+STRIP = [[0, 0], [4, 0], [4, 1], [0, 1]]
+POLYS = [SQUARE, STRIP, SQUARE, STRIP, [[0, 0], [1, 0], [1, 3], [0, 3]]]
+
+
+def test_prefix_decode_matches_full_decode():
+    assistant = NFPAssistant(POLYS)
+    decoder = PrefixDecoder(20, 4, POLYS, assistant)
+    angles = (0, 90, 0, 90, 90)
+    orders = [(0, 1, 2, 3, 4), (0, 1, 2, 4, 3), (0, 1, 3, 2, 4), (2, 3, 0, 1, 4)]
+    for order in orders:
+        expected = decode(20, 4, POLYS, assistant, order, angles)
+        assert decoder.decode(order, angles).polygons == expected.polygons
+    stats = decoder.stats()
+    # 3 детали из кэша для второго порядка и 2 для третьего; четвёртый -
+    # те же формы в том же порядке, что и первый (копии взаимозаменяемы)
+    assert stats["resumed"] == 3 + 2 + 5
+    assert stats["placed"] == 5 + 2 + 3
+
+
+def test_cache_evicts_by_depth_and_prunes_nodes():
+    cache = DecodeCache(max_parts=5)
+    node = cache.root
+    for key in "abc":
+        node = cache.child(node, key)
+        cache.store(node, key)
+    assert cache.stats()["weight"] == 6 - 1  # "a" (вес 1) вытеснен
+    assert cache.resume("abc")[1] == "c"
+    assert cache.resume("ab")[1] == "b"
+    assert cache.resume("a")[1] is None
+
+    other = cache.child(cache.root, "x")
+    cache.store(other, "x")  # вытесняется "c" (давно не использованный)
+    assert cache.resume("abc")[1] == "b"
+    assert "c" not in cache.root.children["a"].children["b"].children
+
+
+def test_stride_leaves_no_nodes_without_state():
+    decoder = PrefixDecoder(20, 4, POLYS, NFPAssistant(POLYS), stride=2)
+    angles = (0, 90, 0, 90, 90)
+    for order in [(0, 1, 2, 3, 4), (4, 3, 2, 1, 0), (0, 4, 1, 3, 2)]:
+        decoder.decode(order, angles)
+    leaves, stack = [], [decoder.cache.root]
+    while stack:
+        node = stack.pop()
+        stack.extend(node.children.values())
+        if not node.children and node is not decoder.cache.root:
+            leaves.append(node)
+    assert leaves and all(node in decoder.cache.states and node.depth % 2 == 0 for node in leaves)
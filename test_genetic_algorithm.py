@@ -0,0 +1,34 @@
+from shapely.geometry import Polygon
+
+from genetic_algorithm import GeneticAlgorithm
+from nfp_assistant import NFPAssistant
+from settings import NestConfig
+
+SQUARE = [[0, 0], [2, 0], [2, 2], [0, 2]]
+STRIP = [[0, 0], [4, 0], [4, 1], [0, 1]]
+
+
+def test_genetic_algorithm_improves_or_keeps_best():
+    polys = [SQUARE, SQUARE, STRIP, STRIP, [[0, 0], [1, 0], [1, 3], [0, 3]]]
+    config = NestConfig({"POPULATION_SIZE": 6, "ROTATIONS": 2, "GROUP_ROTATION": True})
+    for parallel in [False, True]:
+        ga = GeneticAlgorithm(
+            20, 4, polys, NFPAssistant(polys), config,
+            generations=4, patience=2, parallel=parallel, workers=2, seed=3,
+        )
+        bests = [item["best"] for item in ga.history]
+        assert bests == sorted(bests)
+        assert all(item["mean"] <= item["best"] for item in ga.history)
+        assert len(ga.history) <= 4
+        assert ga.best_fitness == bests[-1] > 0
+
+        # Копии одной формы повернуты одинаково
+        order, angles = ga.best
+        assert angles[0] == angles[1] and angles[2] == angles[3]
+        shapes = [Polygon(poly) for poly in ga.blf.polygons]
+        assert len(shapes) == len(polys)
+        assert all(
+            shapes[i].intersection(shapes[j]).area < 1e-9
+            for i in range(len(shapes)) for j in range(i)
+        )
+        assert ga.best_fitness == sum(shape.area for shape in shapes) / (ga.blf.getLength() * 4)
@@ -0,0 +1,43 @@
+import pytest
+from shapely.geometry import Polygon
+
+from layout import Layout, Part
+from util.polygon_util import check_bound
+
+
+def test_part_metadata_matches_shapely():
+    poly = [[3, 1], [7, 1], [7, 4], [5, 6], [3, 4]]
+    part = Part(poly)
+    shape = Polygon(poly)
+    assert part.bounds == shape.bounds
+    assert part.extremes == check_bound(poly)
+    assert part.area == shape.area
+    assert part.centroid.tolist() == pytest.approx(list(shape.centroid.coords[0]))
+    assert part.geometry.equals(shape)
+
+
+def test_part_copies_share_shape_and_move_by_offset():
+    part = Part([[0, 0], [2, 0], [2, 1], [0, 1]], shape_id="a")
+    copy = part.copy()
+    copy.translate(5, 3)
+    assert copy.coords is part.coords
+    assert part.polygon() == [[0, 0], [2, 0], [2, 1], [0, 1]]
+    assert copy.polygon() == [[5, 3], [7, 3], [7, 4], [5, 4]]
+    assert copy.placed_bounds == (5, 3, 7, 4)
+    assert copy.reference.tolist() == [7, 4]
+
+    layout = Layout(10, 5, [part, copy])
+    assert layout.length() == 7
+    assert layout.bounds() == (0, 0, 7, 4)
+    assert layout.utilization() == 4 / 50
+
+
+def test_part_outline_follows_placement_and_rotation():
+    outline = [[0, 0], [2, 0], [2, 1], [0, 1]]
+    part = Part([[-1, -1], [3, -1], [3, 2], [-1, 2]], outline=outline)
+    assert part.area == 2
+    part.translate(1, 1)
+    assert part.polygon() == [[1, 1], [3, 1], [3, 2], [1, 2]]
+    rotated = part.rotated(90)
+    assert rotated.polygon() == [[2.5, 0.5], [2.5, 2.5], [1.5, 2.5], [1.5, 0.5]]
+    assert Polygon(rotated.points).contains(Polygon(rotated.polygon()))
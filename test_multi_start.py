@@ -0,0 +1,25 @@
+import pytest
+
+from multi_start import ORDER_RULES, MultiStart
+from nfp_assistant import NFPAssistant
+
+SQUARE = [[0, 0], [2, 0], [2, 2], [0, 2]]
+STRIP = [[0, 0], [4, 0], [4, 1], [0, 1]]
+POLYS = [SQUARE, STRIP, [[0, 0], [1, 0], [1, 3], [0, 3]], STRIP, SQUARE]
+
+
+def test_portfolio_keeps_best_rule():
+    for parallel in [False, True]:
+        multi = MultiStart(20, 4, POLYS, NFPAssistant(POLYS), random_starts=2, parallel=parallel, workers=2)
+        names = [item["rule"] for item in multi.results]
+        assert names == list(ORDER_RULES) + ["score+random0", "area+random1"]
+        assert multi.best_utilization == max(item["utilization"] for item in multi.results)
+        assert multi.best_rule in names
+        assert multi.best_utilization == pytest.approx(
+            sum(part.area for part in multi.blf.parts) / (multi.blf.getLength() * 4)
+        )
+
+
+def test_unknown_rule_rejected():
+    with pytest.raises(ValueError):
+        MultiStart(20, 4, POLYS, NFPAssistant(POLYS), rules=["missing"])
@@ -0,0 +1,186 @@
+import pytest
+
+from nfp_assistant import NFPAssistant
+from nfp_store import NFPStore, nfp_key
+from part_registry import get_shape_id
+
+TEST_POLYGONS = [
+    [[0, 0], [4, 0], [4, 2], [0, 2]],
+    [[0, 0], [2, 0], [1, 2]],
+    [[0, 0], [2, 0], [2, 2], [1, 2], [1, 1], [0, 1]],
+    [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [0, 1]],
+]
+
+
+def test_parallel_nfp_matches_serial():
+    """Параллельный расчёт заполняет nfp_list так же, как последовательный"""
+    serial = NFPAssistant(TEST_POLYGONS, get_all_nfp=True, nfp_engine="vector")
+    parallel = NFPAssistant(
+        TEST_POLYGONS,
+        get_all_nfp=True,
+        nfp_engine="vector",
+        parallel=True,
+        workers=2,
+        chunk_size=3,
+        parallel_min_pairs=1,
+    )
+    assert parallel.nfp_list == serial.nfp_list
+
+
+def test_nfp_store_roundtrip(tmp_path):
+    """NFP из хранилища подходят для сдвинутых копий тех же форм"""
+    path = str(tmp_path / "nfp.store")
+    poly1, poly2 = TEST_POLYGONS[0], TEST_POLYGONS[2]
+    store = NFPStore(path)
+    store.put(poly1, poly2, [[0, 0], [1, 0], [1, 1]])
+    assert store.get(poly1, poly2, angle=90) is None
+
+    moved = [[x + 10, y - 5] for x, y in poly1]
+    reopened = NFPStore(path)
+    assert len(reopened) == 1
+    assert reopened.get(moved, poly2) == [[10, -5], [11, -5], [11, -4]]
+
+
+def test_nfp_store_refresh_replaces_mapping(tmp_path):
+    """refresh закрывает прежнее отображение, выданные массивы остаются целыми"""
+    path = str(tmp_path / "nfp.store")
+    poly1, poly2 = TEST_POLYGONS[0], TEST_POLYGONS[2]
+    NFPStore(path).put(poly1, poly2, [[0, 0], [1, 0], [1, 1]])
+    reader = NFPStore(path)
+    arr = reader.get_array(nfp_key(poly1, poly2))
+    previous = reader._mmap
+    NFPStore(path).put(poly2, poly1, [[0, 0], [2, 0], [2, 2]])
+    reader.refresh()
+    assert previous.closed and not reader._mmap.closed
+    assert arr.tolist() == [[0, 0], [1, 0], [1, 1]]
+    assert reader.get(poly2, poly1) == [[0, 0], [2, 0], [2, 2]]
+
+
+def test_nfp_store_rejects_old_version(tmp_path):
+    path = tmp_path / "old.store"
+    path.write_bytes(b"NFPSTOR1")
+    with pytest.raises(ValueError, match="старой версии"):
+        NFPStore(str(path))
+
+
+def test_shape_id_ignores_translation():
+    """Сдвинутые копии с координатами в 5 знаков - одна форма (сдвиг сетки GRID_PHASE)"""
+    poly = [[0.0, 0.0], [20.46275, -12.96416], [72.70035, 41.92101], [49.38339, 58.97167], [8.26075, 24.34445]]
+    for dx, dy in [(0.1, 0.2), (123.45678, -7.3), (1000.00001, 0.5)]:
+        moved = [[x + dx, y + dy] for x, y in poly]
+        assert get_shape_id(moved) == get_shape_id(poly)
+        assert nfp_key(moved, poly) == nfp_key(poly, poly)
+
+
+def test_history_loaded_from_store(tmp_path):
+    path = str(tmp_path / "history" / "nfp.store")
+    computed = NFPAssistant(
+        TEST_POLYGONS, get_all_nfp=True, store_nfp=True, store_path=path
+    )
+    loaded = NFPAssistant(TEST_POLYGONS, load_history=True, history_path=path)
+    assert loaded.nfp_list == computed.nfp_list
+
+
+def test_registry_shares_nfp_between_copies():
+    """Сдвинутые копии детали - один тип реестра и одна строка nfp_list"""
+    moved = [[x + 7, y + 3] for x, y in TEST_POLYGONS[1]]
+    assistant = NFPAssistant(TEST_POLYGONS + [moved, TEST_POLYGONS[1]])
+    assert len(assistant.polys) == len(TEST_POLYGONS)
+    assert assistant.getShapeId(moved) == assistant.getShapeId(TEST_POLYGONS[1])
+    assert assistant.registry.quantities()[assistant.getShapeId(moved)] == 3
+
+    nfp = assistant.getDirectNFP(TEST_POLYGONS[1], TEST_POLYGONS[0])
+    moved_nfp = assistant.getDirectNFP(
+        moved, TEST_POLYGONS[0], ids=(assistant.getShapeId(moved), assistant.getShapeId(TEST_POLYGONS[0]))
+    )
+    assert moved_nfp == [[x + 7, y + 3] for x, y in nfp]
+
+
+def test_symmetric_nfp_matches_direct():
+    from shapely.geometry import Polygon
+
+    direct = NFPAssistant(TEST_POLYGONS, nfp_engine="vector")
+    expected = Polygon(direct.getDirectNFP(TEST_POLYGONS[0], TEST_POLYGONS[2]))
+
+    symmetric = NFPAssistant(TEST_POLYGONS, nfp_engine="vector")
+    symmetric.getDirectNFP(TEST_POLYGONS[2], TEST_POLYGONS[0])
+    result = Polygon(symmetric.getDirectNFP(TEST_POLYGONS[0], TEST_POLYGONS[2]))
+    assert result.symmetric_difference(expected).area < 1e-6
+
+
+def test_lazy_nfp_cache_matches_eager():
+    """Ленивый режим отдаёт те же NFP и держит не больше cache_size пар"""
+    from shapely.geometry import Polygon
+
+    eager = NFPAssistant(TEST_POLYGONS, get_all_nfp=True, nfp_engine="minkowski")
+    lazy = NFPAssistant(
+        TEST_POLYGONS, get_all_nfp=True, nfp_engine="minkowski", lazy=True, cache_size=3
+    )
+    assert len(lazy.nfp_cache) == 0
+
+    for i, poly1 in enumerate(TEST_POLYGONS):
+        for j, poly2 in enumerate(TEST_POLYGONS):
+            result = Polygon(lazy.getDirectNFP(poly1, poly2, index=[i, j]))
+            expected = Polygon(eager.getDirectNFP(poly1, poly2, index=[i, j]))
+            assert result.symmetric_difference(expected).area < 1e-6
+    # Кэш getDirectNFP хранит только сдвиги, NFP - лишь в nfp_cache
+    assert all(len(shift) == 2 for _, shift in lazy._nfp_cache.items())
+    lazy._nfp_cache.clear()
+    lazy.getDirectNFP(TEST_POLYGONS[3], TEST_POLYGONS[3])
+
+    stats = lazy.cacheStats()["matrix"]
+    assert stats["size"] == 3
+    assert stats["evictions"] == 13
+    assert stats["misses"] == 16
+    assert stats["hits"] >= 1
+
+
+def test_rotated_nfp_from_relative_angle():
+    """NFP повёрнутых вариантов выводится из NFP по относительному углу"""
+    from shapely.geometry import Polygon
+    from nfp_assistant import compute_nfp
+
+    assistant = NFPAssistant(TEST_POLYGONS, nfp_engine="minkowski", rotations=4, precompute_rotations=True)
+    base1, base2 = assistant.registry.ids[2], assistant.registry.ids[3]
+    for alpha, beta in [(90, 90), (90, 180), (270, 0), (0, 270)]:
+        id1 = assistant.getRotatedShapeId(base1, alpha)
+        id2 = assistant.getRotatedShapeId(base2, beta)
+        poly1, poly2 = assistant.registry.get(id1), assistant.registry.get(id2)
+        expected = Polygon(compute_nfp(poly1, poly2, "minkowski").nfp)
+        result = Polygon(assistant.getDirectNFP(poly1, poly2, ids=(id1, id2)))
+        assert result.symmetric_difference(expected).area < 1e-6
+
+
+def test_direct_cache_is_keyed_by_shape_and_position():
+    """Разные формы равной площади не путаются, сдвинутые копии получают сдвинутый NFP"""
+    square = [[0, 0], [2, 0], [2, 2], [0, 2]]
+    strip = [[0, 0], [4, 0], [4, 1], [0, 1]]
+    assistant = NFPAssistant([square, strip, TEST_POLYGONS[1]], nfp_engine="minkowski")
+    nfp_square = assistant.getDirectNFP(square, TEST_POLYGONS[1])
+    nfp_strip = assistant.getDirectNFP(strip, TEST_POLYGONS[1])
+    assert nfp_square != nfp_strip
+
+    moved = [[x + 10, y + 20] for x, y in square]
+    assert assistant.getDirectNFP(moved, TEST_POLYGONS[1]) == [[x + 10, y + 20] for x, y in nfp_square]
+    stats = assistant.cacheStats()["direct"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+
+def test_mirrored_variant_nfp():
+    """NFP отражённых и повёрнутых вариантов совпадает с прямым расчётом"""
+    from shapely.geometry import Polygon
+    from nfp_assistant import compute_nfp
+
+    assistant = NFPAssistant(TEST_POLYGONS, nfp_engine="minkowski")
+    assistant.precomputeOrientations([0, 90, 180, 270], mirror=True)
+    base1, base2 = assistant.registry.ids[2], assistant.registry.ids[3]
+    mirror1 = assistant.getMirroredShapeId(base1)
+    assert assistant.getMirroredShapeId(mirror1) == base1
+    for alpha, beta in [(90, 0), (180, 270)]:
+        id1 = assistant.getRotatedShapeId(mirror1, alpha)
+        id2 = assistant.getRotatedShapeId(base2, beta)
+        poly1, poly2 = assistant.registry.get(id1), assistant.registry.get(id2)
+        expected = Polygon(compute_nfp(poly1, poly2, "minkowski").nfp)
+        result = Polygon(assistant.getDirectNFP(poly1, poly2, ids=(id1, id2)))
+        assert result.symmetric_difference(expected).area < 1e-6
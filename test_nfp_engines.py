@@ -0,0 +1,111 @@
+from shapely.geometry import Polygon
+from nfp import MinkowskiNFP, NFP, VectorNFP
+from nfp_assistant import NFPAssistant
+from util.nfp_kernel import poly_to_array, trim_scale_batch
+
+TEST_POLYGONS = [
+    [[0, 0], [4, 0], [4, 2], [0, 2]],
+    [[0, 0], [2, 0], [1, 2]],
+    [[0, 0], [2, 0], [2, 2], [1, 2], [1, 1], [0, 1]],
+    [[0, 0], [2, 0], [3, 1], [2, 2], [1, 2], [0, 1]],
+    [[0, 0], [3, 0], [3, 3], [2, 3], [2, 1], [0, 1]],
+    [[0, 0], [4, 0], [4, 1], [3, 1], [3, 2], [1, 2], [1, 1], [0, 1]],
+]
+
+
+def assert_same_nfp(nfp1, nfp2):
+    shape1 = Polygon(nfp1).buffer(0)
+    shape2 = Polygon(nfp2).buffer(0)
+    assert shape1.symmetric_difference(shape2).area < 1e-6 * max(shape1.area, 1)
+
+
+def test_vector_touching_matches_orbital():
+    """Векторное ядро находит те же касания, что и попарный перебор рёбер"""
+    for poly1 in TEST_POLYGONS:
+        for poly2 in TEST_POLYGONS:
+            orbital = NFP(poly1, poly2)
+            vector = VectorNFP(poly1, poly2)
+            expected = orbital.detectTouching()
+            actual = vector.detectTouching()
+            assert len(actual) == len(expected)
+            for rec1, rec2 in zip(expected, actual):
+                assert rec1["edge1"] == rec2["edge1"]
+                assert rec1["edge2"] == rec2["edge2"]
+                assert abs(rec1["pt"][0] - rec2["pt"][0]) < 1e-9
+                assert abs(rec1["pt"][1] - rec2["pt"][1]) < 1e-9
+                for key in ("edge1_bound", "edge2_bound", "stationary_start", "orbiting_start"):
+                    assert rec1[key] == rec2[key]
+
+
+def test_vector_nfp_matches_orbital():
+    """NFP векторной реализации совпадает с исходной"""
+    for poly1 in TEST_POLYGONS:
+        for poly2 in TEST_POLYGONS:
+            orbital = NFP(poly1, poly2)
+            vector = VectorNFP(poly1, poly2)
+            assert orbital.error == vector.error
+            if orbital.error > 0:
+                assert_same_nfp(orbital.nfp, vector.nfp)
+
+
+def test_trim_scale_batch():
+    """Вектор укорачивается до первого касания с противоположным ребром"""
+    stationary = poly_to_array([[0, 0], [4, 0], [4, 4], [0, 4]])
+    sliding = poly_to_array([[6, 1], [8, 1], [8, 3], [6, 3]])
+    assert trim_scale_batch(stationary, sliding, [-4, 0]) == 0.5
+    # Движение от фигуры ничем не ограничено
+    assert trim_scale_batch(stationary, sliding, [4, 0]) == 1.0
+    # Касание вершиной уже в начале пути не укорачивает вектор
+    sliding = poly_to_array([[4, 1], [6, 1], [6, 3], [4, 3]])
+    assert trim_scale_batch(stationary, sliding, [2, 0]) == 1.0
+    assert trim_scale_batch(stationary, sliding, [0, 2]) == 0.5
+
+
+def test_minkowski_nfp_matches_orbital():
+    """Сумма Минковского даёт тот же NFP, что и орбитальный алгоритм"""
+    for poly1 in TEST_POLYGONS:
+        for poly2 in TEST_POLYGONS:
+            orbital = NFP(poly1, poly2)
+            minkowski = MinkowskiNFP(poly1, poly2)
+            assert minkowski.error > 0
+            if orbital.error > 0:
+                assert_same_nfp(orbital.nfp, minkowski.nfp)
+
+
+def test_auto_engine_uses_minkowski_for_convex_pairs():
+    convex = [[0, 0], [4, 0], [4, 2], [0, 2]]
+    concave = [[0, 0], [2, 0], [2, 2], [1, 2], [1, 1], [0, 1]]
+    triangle = [[0, 0], [2, 0], [1, 2]]
+    nfp_assistant = NFPAssistant([convex, concave], nfp_engine="auto")
+    assert nfp_assistant.computeNFP(convex, convex).path == "rectangle"
+    assert isinstance(nfp_assistant.computeNFP(convex, triangle), MinkowskiNFP)
+    assert not isinstance(nfp_assistant.computeNFP(convex, concave), MinkowskiNFP)
+
+
+def test_closed_form_paths_match_minkowski():
+    """Прямоугольники и выпуклые пары в замкнутом виде дают тот же NFP"""
+    rectangle = [[0, 0], [4, 0], [4, 2], [0, 2]]
+    shifted = [[13, 12], [10, 12], [10, 11], [13, 11]]  # другой порядок вершин
+    triangle = [[0, 0], [2, 0], [1, 2]]
+    concave = [[0, 0], [2, 0], [2, 2], [1, 2], [1, 1], [0, 1]]
+    nfp_assistant = NFPAssistant([rectangle, shifted, triangle, concave], nfp_engine="auto")
+    for poly1, poly2 in [(rectangle, shifted), (shifted, rectangle), (rectangle, triangle), (triangle, shifted)]:
+        assert_same_nfp(nfp_assistant.getDirectNFP(poly1, poly2), MinkowskiNFP(poly1, poly2, rectangle=False).nfp)
+    nfp_assistant.getDirectNFP(concave, triangle)
+    assert nfp_assistant.pathStats() == {"rectangle": 1, "symmetric": 1, "convex": 2, "vector": 1}
+
+    # Явно выбранная реализация считает и прямоугольники, и выпуклые пары сама
+    nfp_assistant = NFPAssistant([rectangle, shifted, triangle], nfp_engine="vector")
+    assert_same_nfp(nfp_assistant.getDirectNFP(rectangle, shifted), MinkowskiNFP(rectangle, shifted).nfp)
+    nfp_assistant.getDirectNFP(rectangle, triangle)
+    assert nfp_assistant.pathStats() == {"vector": 2}
+
+
+def test_default_engine_takes_closed_form_paths():
+    rectangle = [[0, 0], [4, 0], [4, 2], [0, 2]]
+    strip = [[5, 5], [7, 5], [7, 6], [5, 6]]
+    triangle = [[0, 0], [2, 0], [1, 2]]
+    nfp_assistant = NFPAssistant([rectangle, strip], get_all_nfp=True)
+    assert nfp_assistant.nfp_paths == {"rectangle": 4}
+    nfp_assistant = NFPAssistant([rectangle, triangle], get_all_nfp=True)
+    assert nfp_assistant.nfp_paths["convex"] > 0
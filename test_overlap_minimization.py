@@ -0,0 +1,40 @@
+from shapely.geometry import Polygon, box
+
+from bottom_left_fill import BottomLeftFill
+from nfp import NFP
+from nfp_assistant import NFPAssistant
+from overlap_minimization import OverlapMinimization
+from util.polygon_util import penetration_depths
+
+SQUARE = [[0, 0], [2, 0], [2, 2], [0, 2]]
+STRIP = [[0, 0], [3, 0], [3, 1], [0, 1]]
+
+
+def test_penetration_depths_match_nfp_depth():
+    nfp = NFP(SQUARE, [[1, 1], [3, 1], [3, 3], [1, 3]])
+    assert nfp.getDepth() == 1.0
+    depths = penetration_depths([Polygon(nfp.nfp), box(10, 10, 12, 12)], [[3, 3], [2, 1], [5, 5], [4, 2]])
+    assert depths.tolist() == [[1.0, 0.0], [1.0, 0.0], [0.0, 0.0], [0.0, 0.0]]
+
+
+def test_compaction_shortens_strip_without_overlaps():
+    polys = [STRIP, STRIP, SQUARE, SQUARE, [[0, 0], [1, 0], [1, 3], [0, 3]]]
+    blf = BottomLeftFill(30, 3, polys, NFPAssistant(polys))
+    before = blf.getLength()
+    compaction = OverlapMinimization(blf)
+    lengths = [length for _, length in compaction.trajectory]
+    assert lengths[0] == before and lengths == sorted(lengths, reverse=True)
+    assert compaction.length < before
+    assert blf.width == blf.getLength() == compaction.length
+    assert len(blf.placed_index) == len(polys)
+
+    shapes = [Polygon(poly) for poly in blf.polygons]
+    assert all(
+        shape.bounds[0] >= -1e-9 and shape.bounds[1] >= -1e-9
+        and shape.bounds[2] <= compaction.length + 1e-9 and shape.bounds[3] <= 3 + 1e-9
+        for shape in shapes
+    )
+    assert all(
+        shapes[i].intersection(shapes[j]).area < 1e-6
+        for i in range(len(shapes)) for j in range(i)
+    )
@@ -0,0 +1,40 @@
+from shapely.geometry import Polygon, box
+
+from spatial_index import PlacedIndex
+
+
+def test_placed_index_overlaps():
+    """Касание по ребру - не пересечение; дерево и список новых деталей проверяются вместе"""
+    index = PlacedIndex()
+    for k in range(40):  # часть деталей попадает в STRtree, часть - в список новых
+        index.add(k, box(k * 10, 0, k * 10 + 10, 10))
+    assert index._tree is not None and index._pending
+
+    assert not index.overlaps(box(400, 0, 410, 10))
+    assert not index.overlaps(box(0, 10, 10, 20))  # касание сверху
+    assert index.overlaps(Polygon([[5, 5], [15, 5], [15, 15]]))
+    assert index.overlaps(box(395, 0, 405, 10))
+    assert not index.overlaps(box(395, 0, 405, 10), exclude=39)
+    assert sorted(index.query(box(15, 2, 25, 3))) == [1, 2]
+
+    index.remove(1)
+    assert sorted(index.query(box(15, 2, 25, 3))) == [2]
+    assert len(index) == 39
+
+
+def test_moved_parts_are_marked_until_flush():
+    """Перемещение детали из дерева не перестраивает его, запросы видят новое место"""
+    index = PlacedIndex()
+    for k in range(40):
+        index.add(k, box(k * 10, 0, k * 10 + 10, 10))
+    index.flush()
+    tree = index._tree
+    index.add(3, box(500, 0, 510, 10))
+    assert index._tree is tree
+    assert index.query(box(32, 2, 38, 3)) == []
+    assert index.query(box(502, 2, 508, 3)) == [3]
+    assert index.overlaps_batch([box(32, 2, 38, 3), box(502, 2, 508, 3)]).tolist() == [False, True]
+
+    index.flush()
+    assert index._tree is not tree and not index._stale
+    assert index.query(box(502, 2, 508, 3)) == [3]
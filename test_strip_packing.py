@@ -0,0 +1,59 @@
+from shapely.geometry import Polygon
+
+from bottom_left_fill import BottomLeftFill
+from nfp_assistant import NFPAssistant
+from settings import NestConfig
+from strip_packing import StripPacking
+
+SQUARE = [[0, 0], [2, 0], [2, 2], [0, 2]]
+STRIP = [[0, 0], [3, 0], [3, 1], [0, 1]]
+
+
+def test_resize_keeps_prefix_and_rolls_back():
+    polys = [SQUARE] * 4
+    blf = BottomLeftFill(8, 2, polys, NFPAssistant(polys))
+    assert blf.getLength() == 8
+    assert not blf.resize(6)  # четыре квадрата 2x2 не помещаются в 6x2
+    assert blf.width == 8 and blf.getLength() == 8
+    assert len(blf.placed_index) == 4
+
+
+def test_strip_length_shrinks_to_feasible_layout():
+    polys = [STRIP, STRIP, SQUARE, SQUARE, [[0, 0], [1, 0], [1, 3], [0, 3]]]
+    strip = StripPacking(3, polys, NFPAssistant(polys), length=20)
+    lengths = [length for _, length in strip.trajectory]
+    assert lengths == sorted(lengths, reverse=True)
+    assert strip.lower_bound <= strip.length == lengths[-1]
+    assert strip.length < 20
+
+    shapes = [Polygon(poly) for poly in strip.layout.polygons()]
+    assert len(shapes) == len(polys)
+    assert all(
+        shape.bounds[0] >= 0 and shape.bounds[1] >= 0
+        and shape.bounds[2] <= strip.length and shape.bounds[3] <= 3
+        for shape in shapes
+    )
+    assert all(
+        shapes[i].intersection(shapes[j]).area < 1e-9
+        for i in range(len(shapes)) for j in range(i)
+    )
+
+
+def test_incomplete_initial_layout_is_not_shrunk():
+    polys = [SQUARE, SQUARE, STRIP]
+    strip = StripPacking(3, polys, NFPAssistant(polys), length=20, time_limit=0)
+    assert strip.complete is False
+    assert strip.iterations == 0 and len(strip.trajectory) == 1
+    assert sorted(strip.blf.unplaced) == [0, 1, 2]
+
+
+def test_rotation_search_follows_config():
+    polys = [STRIP, SQUARE]
+    config = NestConfig()
+    config.ROTATIONS = 2
+    strip = StripPacking(3, polys, NFPAssistant(polys), length=20, config=config)
+    assert strip.blf.full_rotation
+    assert [angle for angle, _ in strip.blf.orientation_set] == [0, 180]
+    config.ROTATIONS = 1
+    strip = StripPacking(3, polys, NFPAssistant(polys), length=20, config=config)
+    assert not strip.blf.full_rotation
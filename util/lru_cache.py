@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Словарь ограниченного размера с вытеснением давно не использованных
+    элементов и счётчиками попаданий, промахов и вытеснений.
+    maxsize=None - без ограничения. Размер - сумма весов элементов (weight в
+    put, по умолчанию 1); on_evict(key, value) вызывается для вытесненных.
+    """
+
+    def __init__(self, maxsize=None, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._weights = {}
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def items(self):
+        """Пары (ключ, значение) от давних к недавним, без учёта в статистике"""
+        return list(self._data.items())
+
+    def get(self, key, default=None):
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value, weight=1):
+        self.weight += weight - self._weights.get(key, 0)
+        self._weights[key] = weight
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while self.weight > self.maxsize and self._data:
+                old_key, old_value = self._data.popitem(last=False)
+                self.weight -= self._weights.pop(old_key)
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(old_key, old_value)
+
+    def clear(self):
+        self._data.clear()
+        self._weights.clear()
+        self.weight = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "weight": self.weight,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
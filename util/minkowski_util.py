@@ -0,0 +1,248 @@
+from functools import lru_cache
+
+import numpy as np
+from shapely.geometry import Polygon
+from shapely.ops import unary_union
+
+from constant.calculation_constants import BIAS
+
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def clean_polygon(poly):
+    """
+    Удаление повторяющихся (с допуском BIAS) и коллинеарных вершин,
+    ориентация против часовой стрелки. Возвращает массив (n, 2).
+    """
+    pts = []
+    for pt in poly:
+        if not pts or abs(pts[-1][0] - pt[0]) >= BIAS or abs(pts[-1][1] - pt[1]) >= BIAS:
+            pts.append((float(pt[0]), float(pt[1])))
+    while len(pts) > 1 and abs(pts[0][0] - pts[-1][0]) < BIAS and abs(pts[0][1] - pts[-1][1]) < BIAS:
+        pts.pop()
+
+    changed = True
+    while changed and len(pts) > 3:
+        changed = False
+        for i in range(len(pts)):
+            if abs(_cross(pts[i - 1], pts[i], pts[(i + 1) % len(pts)])) < BIAS:
+                pts.pop(i)
+                changed = True
+                break
+
+    arr = np.array(pts, dtype=np.float64).reshape(-1, 2)
+    if signed_area(arr) < 0:
+        arr = arr[::-1].copy()
+    return arr
+
+
+def signed_area(arr):
+    x, y = arr[:, 0], arr[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def is_convex(poly):
+    """Выпуклый ли полигон (повторы и коллинеарные вершины не учитываются)"""
+    arr = clean_polygon(poly)
+    if len(arr) < 3:
+        return False
+    edges = np.roll(arr, -1, axis=0) - arr
+    cross = edges[:, 0] * np.roll(edges[:, 1], -1) - edges[:, 1] * np.roll(edges[:, 0], -1)
+    return bool(np.all(cross > -BIAS))
+
+
+def is_rectangle(poly):
+    """Прямоугольник со сторонами, параллельными осям"""
+    arr = clean_polygon(poly)
+    if len(arr) != 4:
+        return False
+    edges = np.roll(arr, -1, axis=0) - arr
+    return bool(np.all(np.min(np.abs(edges), axis=1) < BIAS))
+
+
+def classify_polygon(poly):
+    """Тип формы: "rectangle" (по осям), "convex" или "concave" """
+    if is_rectangle(poly):
+        return "rectangle"
+    if is_convex(poly):
+        return "convex"
+    return "concave"
+
+
+def minkowski_sum_convex(p, q):
+    """
+    Сумма Минковского двух выпуклых полигонов (массивы против часовой стрелки)
+    слиянием рёбер по полярному углу, O(n + m).
+    """
+
+    def from_bottom(arr):
+        start = np.lexsort((arr[:, 0], arr[:, 1]))[0]
+        return np.roll(arr, -start, axis=0)
+
+    p, q = from_bottom(p), from_bottom(q)
+    n, m = len(p), len(q)
+    res = []
+    i = j = 0
+    while i < n or j < m:
+        res.append(p[i % n] + q[j % m])
+        e1 = p[(i + 1) % n] - p[i % n]
+        e2 = q[(j + 1) % m] - q[j % m]
+        cross = e1[0] * e2[1] - e1[1] * e2[0]
+        if j >= m or (i < n and cross > 0):
+            i += 1
+        elif i >= n or cross < 0:
+            j += 1
+        else:
+            i += 1
+            j += 1
+    return np.array(res)
+
+
+def _is_ear(pts, prev, cur, nxt, others):
+    a, b, c = pts[prev], pts[cur], pts[nxt]
+    if _cross(a, b, c) <= 0:
+        return False
+    for k in others:
+        p = pts[k]
+        if (p[0] == a[0] and p[1] == a[1]) or (p[0] == b[0] and p[1] == b[1]) or (p[0] == c[0] and p[1] == c[1]):
+            continue
+        if _cross(a, b, p) >= 0 and _cross(b, c, p) >= 0 and _cross(c, a, p) >= 0:
+            return False
+    return True
+
+
+def triangulate(arr):
+    """Триангуляция отсечением ушей простого полигона против часовой стрелки"""
+    pts = [tuple(pt) for pt in arr.tolist()]
+    remaining = list(range(len(pts)))
+    triangles = []
+    while len(remaining) > 3:
+        for pos in range(len(remaining)):
+            prev = remaining[pos - 1]
+            cur = remaining[pos]
+            nxt = remaining[(pos + 1) % len(remaining)]
+            others = [k for k in remaining if k not in (prev, cur, nxt)]
+            if _is_ear(pts, prev, cur, nxt, others):
+                triangles.append([prev, cur, nxt])
+                remaining.pop(pos)
+                break
+        else:
+            raise ValueError("Не удалось триангулировать полигон")
+    triangles.append(remaining)
+    return triangles
+
+
+def _merge_convex(pts, piece1, piece2, u, v):
+    """Объединение двух выпуклых частей по общей диагонали u-v, если результат выпуклый"""
+    i = piece1.index(v)
+    part1 = piece1[i:] + piece1[:i]  # v ... u
+    j = piece2.index(u)
+    part2 = piece2[j:] + piece2[:j]  # u ... v
+    merged = part1 + part2[1:-1]
+    n = len(merged)
+    for k in (merged.index(u), merged.index(v)):
+        if _cross(pts[merged[k - 1]], pts[merged[k]], pts[merged[(k + 1) % n]]) < 0:
+            return None
+    return merged
+
+
+def convex_decomposition(arr):
+    """
+    Разбиение простого полигона на выпуклые части (алгоритм Хертеля-Мельхорна:
+    триангуляция и удаление лишних диагоналей). Части - массивы против часовой стрелки.
+    """
+    pts = [tuple(pt) for pt in arr.tolist()]
+    pieces = triangulate(arr)
+    merged_any = True
+    while merged_any:
+        merged_any = False
+        for a in range(len(pieces)):
+            edges = {
+                (pieces[a][k], pieces[a][(k + 1) % len(pieces[a])])
+                for k in range(len(pieces[a]))
+            }
+            for b in range(a + 1, len(pieces)):
+                piece = pieces[b]
+                shared = None
+                for k in range(len(piece)):
+                    u, v = piece[k], piece[(k + 1) % len(piece)]
+                    if (v, u) in edges:
+                        shared = (v, u)  # ребро u->v в части a
+                        break
+                if shared is None:
+                    continue
+                merged = _merge_convex(pts, pieces[a], piece, *shared)
+                if merged is not None:
+                    pieces[a] = merged
+                    pieces.pop(b)
+                    merged_any = True
+                    break
+            if merged_any:
+                break
+    return [arr[piece] for piece in pieces]
+
+
+@lru_cache(maxsize=4096)
+def _cached_decomposition(key):
+    return tuple(convex_decomposition(np.array(key, dtype=np.float64)))
+
+
+def get_convex_parts(poly):
+    """
+    Выпуклые части полигона. Разбиение кэшируется по форме, приведённой
+    к первой вершине, поэтому сдвинутые копии детали разбиваются один раз.
+    """
+    arr = clean_polygon(poly)
+    origin = arr[0].copy()
+    key = tuple(map(tuple, (arr - origin).tolist()))
+    if is_convex(arr):
+        return [arr]
+    return [part + origin for part in _cached_decomposition(key)]
+
+
+def rectangle_nfp(stationary, sliding, reference):
+    """
+    NFP двух прямоугольников по осям в замкнутом виде: прямоугольник, стороны
+    которого - суммы сторон, вершины против часовой стрелки от левой нижней.
+    """
+    stationary = np.asarray(stationary, dtype=np.float64)
+    sliding = np.asarray(sliding, dtype=np.float64)
+    min1, max1 = stationary.min(axis=0), stationary.max(axis=0)
+    min2, max2 = sliding.min(axis=0), sliding.max(axis=0)
+    ref = np.asarray(reference, dtype=np.float64)
+    left, bottom = (min1 + ref - max2).tolist()
+    right, top = (max1 + ref - min2).tolist()
+    return [[left, bottom], [right, bottom], [right, top], [left, top]]
+
+
+def convex_nfp(stationary, sliding, reference):
+    """NFP двух выпуклых полигонов - одно слияние рёбер, без разбиения и объединения"""
+    ref = np.asarray(reference, dtype=np.float64)
+    return minkowski_sum_convex(clean_polygon(stationary), ref - clean_polygon(sliding)).tolist()
+
+
+def minkowski_nfp(stationary, sliding, reference):
+    """
+    NFP как сумма Минковского stationary и отражённого sliding: множество
+    положений точки reference детали sliding, при которых она пересекает stationary.
+    Для вогнутых деталей суммы выпуклых частей объединяются.
+    Возвращает shapely Polygon.
+    """
+    ref = np.asarray(reference, dtype=np.float64)
+    parts1 = get_convex_parts(stationary)
+    # Отражение относительно точки - поворот на 180°, ориентация сохраняется
+    parts2 = [ref - part for part in get_convex_parts(sliding)]
+    if len(parts1) == 1 and len(parts2) == 1:
+        return Polygon(minkowski_sum_convex(parts1[0], parts2[0]))
+    sums = [
+        Polygon(minkowski_sum_convex(part1, part2))
+        for part1 in parts1
+        for part2 in parts2
+    ]
+    result = unary_union(sums)
+    if result.geom_type != "Polygon":
+        # Соседние части касаются по общим рёбрам, остаются только щели округления
+        result = max(getattr(result, "geoms", [result]), key=lambda g: g.area)
+    return result
@@ -0,0 +1,202 @@
+import numpy as np
+
+from constant.calculation_constants import BIAS
+from shapely.geometry import LineString
+
+# Порог |sin| угла между отрезками, ниже которого пересечение считается через GEOS
+PARALLEL_EPS = 1e-9
+
+
+def poly_to_array(poly):
+    """Полигон (список точек) в непрерывный массив float64 формы (n, 2)"""
+    return np.ascontiguousarray(poly, dtype=np.float64).reshape(-1, 2)
+
+
+def edges_array(arr):
+    """Начала и концы всех рёбер замкнутого полигона"""
+    return arr, np.roll(arr, -1, axis=0)
+
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def almost_equal_batch(pt1, pt2):
+    """Векторная версия almost_equal"""
+    return (np.abs(pt1[..., 0] - pt2[..., 0]) < BIAS) & (
+        np.abs(pt1[..., 1] - pt2[..., 1]) < BIAS
+    )
+
+
+def almost_contain_batch(p1, p2, pt):
+    """Векторная версия almost_contain(line=[p1, p2], point=pt) с той же логикой"""
+    dx = np.abs(p1[..., 0] - p2[..., 0])
+    dy = np.abs(p1[..., 1] - p2[..., 1])
+    vertical = dx < BIAS
+    horizontal = ~vertical & (dy < BIAS)
+    inclined = ~vertical & ~horizontal
+
+    res_vertical = (np.abs(pt[..., 0] - p1[..., 0]) <= BIAS) & (
+        (pt[..., 1] - p1[..., 1]) * (pt[..., 1] - p2[..., 1]) <= 0
+    )
+    res_horizontal = (np.abs(pt[..., 1] - p1[..., 1]) <= BIAS) & (
+        (pt[..., 0] - p1[..., 0]) * (pt[..., 0] - p2[..., 0]) <= 0
+    )
+
+    arc1 = np.arctan2(p1[..., 1] - p2[..., 1], p1[..., 0] - p2[..., 0])
+    arc2 = np.arctan2(pt[..., 1] - p2[..., 1], pt[..., 0] - p2[..., 0])
+    res_inclined = (
+        (np.abs(p1[..., 0] - pt[..., 0]) >= BIAS)
+        & (np.abs(p2[..., 0] - pt[..., 0]) >= BIAS)
+        & (np.abs(arc1 - arc2) < BIAS)
+        & ((pt[..., 1] - p1[..., 1]) * (p2[..., 1] - pt[..., 1]) > 0)
+        & ((pt[..., 0] - p1[..., 0]) * (p2[..., 0] - pt[..., 0]) > 0)
+    )
+    return (
+        (vertical & res_vertical)
+        | (horizontal & res_horizontal)
+        | (inclined & res_inclined)
+    )
+
+
+def touching_batch(stationary, sliding):
+    """
+    Все касания рёбер stationary x sliding за один проход.
+    Повторяет polygon_util.intersection для каждой пары рёбер:
+    точное пересечение (в т.ч. коллинеарное наложение), затем совпадение
+    вершин с допуском BIAS, затем almost_contain.
+    Возвращает индексы рёбер (i, j) и точки касания, в порядке двойного цикла.
+    """
+    a0, a1 = edges_array(stationary)
+    b0, b1 = edges_array(sliding)
+    a0, a1 = a0[:, None, :], a1[:, None, :]
+    b0, b1 = b0[None, :, :], b1[None, :, :]
+    r = a1 - a0
+    s = b1 - b0
+    qp = b0 - a0
+    shape = (stationary.shape[0], sliding.shape[0])
+
+    denom = _cross(r, s)
+    qp_r = _cross(qp, r)
+    qp_s = _cross(qp, s)
+    parallel = denom == 0
+
+    # Обычное пересечение двух непараллельных отрезков
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(parallel, -1.0, qp_s / np.where(parallel, 1.0, denom))
+        u = np.where(parallel, -1.0, qp_r / np.where(parallel, 1.0, denom))
+    proper = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    pts = a0 + t[..., None] * r
+    # Касание концом отрезка - GEOS возвращает саму вершину
+    pts = np.where((t == 0)[..., None], a0, pts)
+    pts = np.where((t == 1)[..., None], a1, pts)
+    pts = np.where((u == 0)[..., None], b0, pts)
+    pts = np.where((u == 1)[..., None], b1, pts)
+
+    # Коллинеарное наложение - первая точка общего участка по направлению edge1
+    rr = np.sum(r * r, axis=-1)
+    collinear = parallel & (qp_r == 0) & (rr > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        safe_rr = np.where(rr > 0, rr, 1.0)
+        t0 = np.sum(qp * r, axis=-1) / safe_rr
+        t1 = np.sum((b1 - a0) * r, axis=-1) / safe_rr
+    t0, t1 = np.broadcast_to(t0, shape), np.broadcast_to(t1, shape)
+    lo = np.maximum(0.0, np.minimum(t0, t1))
+    hi = np.minimum(1.0, np.maximum(t0, t1))
+    overlap = collinear & (lo <= hi)
+    overlap_start = np.where(
+        (np.minimum(t0, t1) <= 0)[..., None],
+        np.broadcast_to(a0, shape + (2,)),
+        np.where((t0 < t1)[..., None], np.broadcast_to(b0, shape + (2,)),
+                 np.broadcast_to(b1, shape + (2,))),
+    )
+    exact = proper | overlap
+    pts = np.where(overlap[..., None], overlap_start, pts)
+
+    # Совпадение вершин с допуском: побеждает последнее совпадение (a1 важнее a0)
+    a0_eq = almost_equal_batch(a0, b0) | almost_equal_batch(a0, b1)
+    a1_eq = almost_equal_batch(a1, b0) | almost_equal_batch(a1, b1)
+    vertex = ~exact & (a0_eq | a1_eq)
+    pts = np.where((vertex & a1_eq)[..., None], a1, pts)
+    pts = np.where((vertex & ~a1_eq)[..., None], a0, pts)
+
+    # almost_contain: сначала вершины edge1 на edge2, затем вершины edge2 на edge1
+    rest = ~exact & ~vertex
+    found = np.zeros(shape, dtype=bool)
+    for candidate, line_start, line_end in (
+        (a0, b0, b1),
+        (a1, b0, b1),
+        (b0, a0, a1),
+        (b1, a0, a1),
+    ):
+        hit = rest & ~found & almost_contain_batch(line_start, line_end, candidate)
+        pts = np.where(hit[..., None], np.broadcast_to(candidate, shape + (2,)), pts)
+        found |= hit
+
+    touching = exact | vertex | found
+    rows, cols = np.nonzero(touching)
+    return rows, cols, pts[rows, cols]
+
+
+
+def _ray_hits(points, vector, starts, ends):
+    """
+    Параметры t пересечения лучей points + t*vector (t в [0, 1]) с отрезками.
+    Параллельные пары (в т.ч. коллинеарные наложения) пропускаются, как и
+    LineString-результаты в NFP.trimVector. Точки в пределах BIAS от начала
+    или конца луча отбрасываются. Возвращает массив t (n, m), np.inf - нет пересечения.
+    """
+    e = ends - starts
+    denom = vector[0] * e[:, 1] - vector[1] * e[:, 0]
+    w = starts[None, :, :] - points[:, None, :]
+    parallel = denom == 0
+    safe = np.where(parallel, 1.0, denom)
+    t = (w[..., 0] * e[:, 1] - w[..., 1] * e[:, 0]) / safe
+    u = (w[..., 0] * vector[1] - w[..., 1] * vector[0]) / safe
+    hit = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+    # Почти параллельные пары на одной прямой: t в float неустойчив, а GEOS
+    # решает их в повышенной точности. Таких пар единицы - считаем через shapely.
+    e_len = np.hypot(e[:, 0], e[:, 1])
+    v_len = np.hypot(vector[0], vector[1])
+    near_parallel = np.abs(denom) <= PARALLEL_EPS * v_len * e_len
+    offset = np.abs(w[..., 0] * e[:, 1] - w[..., 1] * e[:, 0])
+    unstable = near_parallel[None, :] & (offset <= PARALLEL_EPS * (v_len + e_len) * e_len)
+    if unstable.any():
+        hit = hit & ~unstable
+        for i, j in zip(*np.nonzero(unstable)):
+            t_exact = _ray_hit_exact(points[i], vector, starts[j], ends[j])
+            if t_exact is not None:
+                t[i, j] = t_exact
+                hit[i, j] = True
+
+    near_start = (np.abs(t * vector[0]) <= BIAS) & (np.abs(t * vector[1]) <= BIAS)
+    near_end = (np.abs((1 - t) * vector[0]) <= BIAS) & (
+        np.abs((1 - t) * vector[1]) <= BIAS
+    )
+    return np.where(hit & ~near_start & ~near_end, t, np.inf)
+
+
+def _ray_hit_exact(point, vector, start, end):
+    """Пересечение луча с отрезком через GEOS, как в NFP.trimVector"""
+    inter = LineString([point, point + vector]).intersection(LineString([start, end]))
+    if inter.geom_type != "Point":
+        return None
+    axis = 0 if abs(vector[0]) >= abs(vector[1]) else 1
+    return (inter.coords[0][axis] - point[axis]) / vector[axis]
+
+
+def trim_scale_batch(stationary, sliding, vector):
+    """
+    Минимальный допустимый коэффициент сдвига sliding вдоль vector.
+    Вершины sliding проецируются вдоль vector на рёбра stationary,
+    вершины stationary - вдоль -vector на рёбра sliding, всё одним проходом.
+    Возвращает t в (0, 1], vector * t - укороченный вектор.
+    """
+    vector = np.asarray(vector, dtype=np.float64)
+    if not vector.any():
+        return 1.0
+    forward = _ray_hits(sliding, vector, *edges_array(stationary))
+    backward = _ray_hits(stationary, -vector, *edges_array(sliding))
+    scale = min(forward.min(initial=np.inf), backward.min(initial=np.inf))
+    return 1.0 if scale == np.inf else float(scale)
@@ -1,4 +1,6 @@
+import hashlib
 import numpy as np
+import shapely
 
 from constant.calculation_constants import BIAS
 from shapely.geometry import LineString, mapping, Polygon
@@ -46,6 +48,26 @@ def almost_equal(point1, point2):
         return False
 
 
+# Сдвиг сетки округления: границы ячеек не совпадают с десятичными значениями
+# (координаты с 5 знаками после запятой часто лежат ровно на k + 0.5 шага BIAS,
+# и шум сдвига/поворота переносил бы их в соседнюю ячейку)
+GRID_PHASE = 0.6180339887
+
+
+def canonical_polygon(poly):
+    """
+    Форма полигона без учёта положения: вершины в исходном порядке,
+    сдвинутые к первой вершине и округлённые до сетки BIAS (int64).
+    """
+    arr = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+    return np.floor((arr - arr[0]) / BIAS + GRID_PHASE).astype(np.int64)
+
+
+def shape_digest(poly):
+    """Хэш формы полигона, не зависящий от переноса (16 байт)"""
+    return hashlib.blake2b(canonical_polygon(poly).tobytes(), digest_size=16).digest()
+
+
 def check_bound(poly):
     return (
         check_left(poly),
@@ -56,32 +78,28 @@ def check_bound(poly):
 
 
 def check_left(poly):
-    polyP = Polygon(poly)
-    min_x = polyP.bounds[0]
+    min_x = min(point[0] for point in poly)  # без построения shapely-полигона
     for index, point in enumerate(poly):
         if point[0] == min_x:
             return index
 
 
 def check_bottom(poly):
-    polyP = Polygon(poly)
-    min_y = polyP.bounds[1]
+    min_y = min(point[1] for point in poly)  # без построения shapely-полигона
     for index, point in enumerate(poly):
         if point[1] == min_y:
             return index
 
 
 def check_right(poly):
-    polyP = Polygon(poly)
-    max_x = polyP.bounds[2]
+    max_x = max(point[0] for point in poly)  # без построения shapely-полигона
     for index, point in enumerate(poly):
         if point[0] == max_x:
             return index
 
 
 def check_top(poly):
-    polyP = Polygon(poly)
-    max_y = polyP.bounds[3]
+    max_y = max(point[1] for point in poly)  # без построения shapely-полигона
     for index, point in enumerate(poly):
         if point[1] == max_y:
             return index
@@ -317,24 +335,77 @@ def slide_to_point(poly, pt1, pt2):
     slide_poly(poly, pt2[0] - pt1[0], pt2[1] - pt1[1])
 
 
-def rotate_polygon(polygon, angle):
-    """Поворот полигона на заданный угол"""
+def rotation_cos_sin(angle):
+    quarter = angle / 90
+    if quarter == int(quarter):
+        return ((1.0, 0.0), (0.0, 1.0), (-1.0, 0.0), (0.0, -1.0))[int(quarter) % 4]
+    angle_rad = np.radians(angle)
+    return np.cos(angle_rad), np.sin(angle_rad)
+
+
+def rotate_polygon(polygon, angle, center=None):
+    """Поворот полигона на заданный угол (вокруг центра масс или точки center)"""
     # Находим центр полигона
-    poly = Polygon(polygon)
-    centroid = poly.centroid
+    if center is None:
+        centroid = Polygon(polygon).centroid
+        center = (centroid.x, centroid.y)
+    cx, cy = center
     
     # Переносим в начало координат
-    translated = [[p[0] - centroid.x, p[1] - centroid.y] for p in polygon]
+    translated = [[p[0] - cx, p[1] - cy] for p in polygon]
     
-    # Поворачиваем
-    angle_rad = np.radians(angle)
-    cos_a = np.cos(angle_rad)
-    sin_a = np.sin(angle_rad)
+    # Поворачиваем (для углов, кратных 90°, - точные значения без шума округления)
+    cos_a, sin_a = rotation_cos_sin(angle)
     
     rotated = []
     for p in translated:
         x = p[0] * cos_a - p[1] * sin_a
         y = p[0] * sin_a + p[1] * cos_a
-        rotated.append([x + centroid.x, y + centroid.y])
+        rotated.append([x + cx, y + cy])
         
     return rotated
+
+
+def offset_polygon(polygon, distance, tolerance=0.0):
+    """
+    Контур, отстоящий от polygon на distance (острые углы - срез на 2 * distance).
+    Результат упрощается с допуском tolerance; чтобы упрощение не съело отступ,
+    контур строится на distance + tolerance. Обход вершин - как у polygon.
+    """
+    poly = Polygon(polygon)
+    shape = poly.buffer(distance + tolerance, join_style="mitre", mitre_limit=2.0)
+    if tolerance > 0:
+        shape = shape.simplify(tolerance, preserve_topology=True)
+    if shape.geom_type != "Polygon":  # отступ 0 у вырожденного полигона и т.п.
+        shape = max(shape.geoms, key=lambda geom: geom.area)
+    coords = [list(pt) for pt in shape.exterior.coords[:-1]]
+    if poly.exterior.is_ccw != shape.exterior.is_ccw:
+        coords.reverse()
+    return coords
+
+
+def mirror_polygon(polygon, center_x=None):
+    """
+    Зеркальное отражение по x относительно вертикали через центр масс (или
+    center_x). Порядок вершин обращается, чтобы сохранить направление обхода.
+    """
+    if center_x is None:
+        center_x = Polygon(polygon).centroid.x
+    return [[2 * center_x - p[0], p[1]] for p in reversed(polygon)]
+
+
+def penetration_depths(nfps, points):
+    """
+    Глубины проникновения (как NFP.getDepth) точек points (m x 2) во все
+    NFP сразу: матрица m x k, расстояние от точки до границы k-го NFP, если
+    точка внутри него, иначе 0. Принадлежность проверяется одним пакетным
+    вызовом на всю матрицу, расстояния - одним вызовом только для пар "внутри".
+    """
+    nfps = np.asarray(nfps, dtype=object)
+    points = shapely.points(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    if not len(nfps) or not len(points):
+        return np.zeros((len(points), len(nfps)))
+    rows, cols = np.nonzero(shapely.contains(nfps[np.newaxis, :], points[:, np.newaxis]))
+    depths = np.zeros((len(points), len(nfps)))
+    depths[rows, cols] = shapely.distance(shapely.boundary(nfps)[cols], points[rows])
+    return depths